@@ -0,0 +1,228 @@
+"""Drive many simulated analyst sessions through the app and report latency and memory.
+
+    python -m benchmarks.load_test --sessions 20 --companies 1000 --rounds 3 --output benchmarks/load_results.json
+
+Each session is a Streamlit AppTest running the real app against the synthetic
+sheet, so every session shares the process-wide caches just like sessions on
+one server do. AppTest can't execute two scripts at once in one process, so
+sessions take turns: one step (a rerun) per session, round-robin. Latencies
+are therefore single-flight; memory is what N open sessions actually cost.
+
+Per round every session types into the autocomplete, adds a few stocks, clicks
+Generate, opens a report section and browses a few companies. After each round
+the process RSS and per-session memory are recorded, so growth across rounds
+(a leak) shows up in the output.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.run_benchmarks import APP_PATH, REPO_ROOT, Results, _git_commit, _timed
+from benchmarks.synthetic_sheet import make_company_names
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+_GENERATE_LABEL = "Generate Reports for Selected Stocks"
+
+
+def current_rss_mb():
+    # /proc gives the current RSS on Linux; elsewhere fall back to the peak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+
+def deep_size(obj, seen=None):
+    """Bytes reachable from obj, counting each object once.
+
+    Lazily parsed reports belong to the shared sheet snapshot rather than to the
+    session holding a reference to them, so they're not counted here.
+    """
+    from report_store import LazyReportDetails
+
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, (LazyReportDetails, type)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+class SimulatedSession:
+    def __init__(self, session_number, company_names, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.session_number = session_number
+        self.rng = random.Random(session_number)
+        self.company_names = company_names
+        self.app = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        self.started = False
+
+    def session_state_bytes(self):
+        return deep_size(self.app.session_state.to_dict())
+
+    @staticmethod
+    def _rerun(widget, action):
+        # None when the widget the flow wanted isn't on the page (e.g. the stock was already added)
+        return None if widget is None else action(widget).run()
+
+    def _button(self, label):
+        return next((button for button in self.app.button if button.label == label), None)
+
+    def _button_starting(self, prefix):
+        return next((button for button in self.app.button if button.label.startswith(prefix)), None)
+
+    def _first_toggle(self, key_prefix):
+        return next((toggle for toggle in self.app.toggle if toggle.key and toggle.key.startswith(key_prefix)), None)
+
+    def _next_browse_page(self):
+        # Look the widget up again after every run; elements from an older run are stale
+        page = next((number for number in self.app.number_input if number.key == "browse_page"), None)
+        return page if page is not None and page.value < page.proto.max else None
+
+    def _open_in_browse(self, name):
+        # What clicking the company's row in the Browse table does; AppTest can't click dataframe rows
+        self.app.session_state["browse_company"] = name
+        return self.app.run()
+
+    def steps(self):
+        """Yield (step name, callable doing one rerun) for one pass through the app."""
+        app = self.app
+        if not self.started:
+            self.started = True
+            yield "first_run", app.run
+
+        picks = self.rng.sample(self.company_names, 3)
+        for name in picks:
+            for end in (1, 3, 5):
+                yield "autocomplete_keystroke", lambda name=name, end=end: app.text_input(key="autocomplete_input").input(name[:end]).run()
+            yield "type_full_name", lambda name=name: app.text_input(key="autocomplete_input").input(name).run()
+            yield "add_stock", lambda: self._rerun(self._button_starting("Add '"), lambda button: button.click())
+
+        yield "generate", lambda: self._rerun(self._button(_GENERATE_LABEL), lambda button: button.click())
+        yield "open_section", lambda: self._rerun(self._first_toggle("tab1:"), lambda toggle: toggle.set_value(True))
+
+        yield "browse_next_page", lambda: self._rerun(self._next_browse_page(), lambda page: page.increment())
+        for name in self.rng.sample(self.company_names, 3):
+            yield "browse_filter", lambda name=name: app.text_input(key="browse_query").input(name[:4]).run()
+            yield "browse_select", lambda name=name: self._open_in_browse(name)
+
+        yield "clear_selections", lambda: self._rerun(self._button("Clear All Selections & Reports"), lambda button: button.click())
+
+
+def _configure_environment(companies, background_refresh):
+    cache_dir = tempfile.mkdtemp(prefix="load-test-cache-")
+    os.environ.update({
+        "GSPREAD_CLIENT_FACTORY": "benchmarks.synthetic_sheet:client_from_env",
+        "SYNTHETIC_SHEET_COMPANIES": str(companies),
+        "BACKGROUND_REFRESH": "1" if background_refresh else "0",
+        "REPORT_SNAPSHOT_PATH": str(Path(cache_dir) / "reports.snapshot"),
+        "STOCK_NAMES_SNAPSHOT_PATH": str(Path(cache_dir) / "stock_names.json"),
+        "REPORT_HISTORY_PATH": str(Path(cache_dir) / "report_history.db"),
+    })
+
+
+def run_load_test(results, sessions, companies, rounds, timeout=600, background_refresh=False):
+    _configure_environment(companies, background_refresh)
+    company_names = make_company_names(companies)
+    scale = sessions
+
+    # One throwaway session first, so imports and the shared caches aren't charged to the sessions
+    warm_up = SimulatedSession(-1, company_names, timeout)
+    elapsed, _ = _timed(warm_up.app.run)
+    results.add("load_test", scale, "cold_first_run", elapsed * 1e3, "ms")
+    del warm_up
+    gc.collect()
+    baseline_rss = current_rss_mb()
+    results.add("load_test", scale, "warm_process_rss", baseline_rss, "MiB")
+
+    simulated = [SimulatedSession(number, company_names, timeout) for number in range(sessions)]
+    latencies = defaultdict(list)
+    skipped = 0
+
+    for round_number in range(1, rounds + 1):
+        # Round-robin: every session takes one step before any session takes its next
+        pending = [session.steps() for session in simulated]
+        while pending:
+            still_running = []
+            for steps in pending:
+                step = next(steps, None)
+                if step is None:
+                    continue
+                name, rerun = step
+                elapsed, ran = _timed(rerun)
+                if ran is None:
+                    skipped += 1 # the widget this step needed wasn't on the page
+                else:
+                    latencies[name].append(elapsed)
+                    latencies["all_reruns"].append(elapsed)
+                still_running.append(steps)
+            pending = still_running
+
+        exceptions = sum(len(session.app.exception) for session in simulated)
+        gc.collect()
+        rss = current_rss_mb()
+        state_bytes = [session.session_state_bytes() for session in simulated]
+        results.add("load_test", scale, f"round{round_number}_rss", rss, "MiB")
+        results.add("load_test", scale, f"round{round_number}_rss_per_session", (rss - baseline_rss) / sessions, "MiB")
+        results.add("load_test", scale, f"round{round_number}_session_state_mean", sum(state_bytes) / len(state_bytes) / 1024, "KiB")
+        results.add("load_test", scale, f"round{round_number}_session_state_max", max(state_bytes) / 1024, "KiB")
+        results.add("load_test", scale, f"round{round_number}_app_exceptions", exceptions, "count")
+
+    for name, samples in sorted(latencies.items()):
+        results.add_timings("load_test", scale, name, samples)
+    results.add("load_test", scale, "skipped_steps", skipped, "count")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10])
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--background-refresh", action="store_true", help="Run the sheet refresher thread during the test")
+    parser.add_argument("--output", type=Path, default=REPO_ROOT / "benchmarks" / "load_results.json")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT) # the app loads assets/ relative to the working directory
+    results = Results()
+    started = time.time()
+    for sessions in args.sessions:
+        run_load_test(results, sessions, args.companies, args.rounds, background_refresh=args.background_refresh)
+
+    payload = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "companies": args.companies,
+        "rounds": args.rounds,
+        "wall_clock_seconds": time.time() - started,
+        "results": results.records,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(payload, indent=2))
+    print(f"Wrote {len(results.records)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""Benchmarks for the report pipeline at growing sheet sizes.
+
+    python -m benchmarks.run_benchmarks --scales 100 1000 10000 --output benchmarks/results.json
+
+Everything runs against the synthetic sheet through a fake gspread client, so
+no Google account is needed. Results are written as JSON (one record per
+benchmark/scale/metric) so two runs can be diffed before a deploy.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.synthetic_sheet import SHEET_NAME, make_company_names, make_fake_client, make_report_store
+from report_store import REPORT_PART_KEYS, SQLiteReportStore, copy_store
+from report_sync import ReportSyncEngine
+from report_text_search import ReportTextIndex
+from stock_search import StockNameIndex
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = REPO_ROOT / "streamlit_app.py"
+
+
+class Results:
+    def __init__(self):
+        self.records = []
+
+    def add(self, benchmark, scale, metric, value, unit):
+        self.records.append({"benchmark": benchmark, "scale": scale, "metric": metric, "value": value, "unit": unit})
+        print(f"{benchmark:<28} {scale:>6} {metric:<32} {value:>12.4f} {unit}")
+
+    def add_timings(self, benchmark, scale, metric, samples):
+        # Latencies are reported in milliseconds
+        ordered = sorted(samples)
+        self.add(benchmark, scale, f"{metric}_p50", statistics.median(ordered) * 1e3, "ms")
+        self.add(benchmark, scale, f"{metric}_p99", ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e3, "ms")
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+
+# --- Transform (what get_google_sheet_data does on a sync) ---
+def bench_transform(results, scale):
+    client = make_fake_client(scale)
+    spreadsheet = client.open(SHEET_NAME)
+
+    tracemalloc.start()
+    engine = ReportSyncEngine(make_report_store(client))
+    cold, _ = _timed(engine.sync)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.add("transform", scale, "cold_sync", cold * 1e3, "ms")
+    results.add("transform", scale, "cold_sync_peak_memory", peak / 2**20, "MiB")
+
+    def parse_everything():
+        for report_data_list in engine.reports.values():
+            details = report_data_list[0]["output"]["report_details"]
+            for part_key in REPORT_PART_KEYS:
+                details.get(part_key)
+    parse_all, _ = _timed(parse_everything)
+    results.add("transform", scale, "parse_all_parts", parse_all * 1e3, "ms")
+
+    spreadsheet.touch()
+    unchanged, _ = _timed(engine.sync)
+    results.add("transform", scale, "resync_no_changes", unchanged * 1e3, "ms")
+
+    spreadsheet.rewrite_rows(0.01)
+    delta, _ = _timed(engine.sync)
+    results.add("transform", scale, "resync_1pct_changed", delta * 1e3, "ms")
+
+    skipped, _ = _timed(engine.sync) # same lastUpdateTime: no download at all
+    results.add("transform", scale, "resync_version_unchanged", skipped * 1e3, "ms")
+
+
+# --- Resident size of the shared report snapshot ---
+def _retained_mib(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 2**20, value
+
+
+def bench_memory(results, scale):
+    client = make_fake_client(scale, fresh_records=True)
+    for label, compress in (("plain", False), ("compressed", True)):
+        engine = ReportSyncEngine(make_report_store(client), compress_bodies=compress)
+        synced, _ = _retained_mib(engine.sync)
+        results.add("memory", scale, f"{label}_after_sync", synced, "MiB")
+
+        def view_everything():
+            # Every part opened once, as if each company had been browsed
+            for report_data_list in engine.reports.values():
+                details = report_data_list[0]["output"]["report_details"]
+                for part_key in REPORT_PART_KEYS:
+                    details.get(part_key)
+        viewed, _ = _retained_mib(view_everything)
+        results.add("memory", scale, f"{label}_growth_after_viewing_all", viewed, "MiB")
+        del engine
+
+
+# --- Autocomplete ---
+def _keystrokes(names, count=40):
+    # Type out a spread of names one character at a time, plus a few typos
+    queries = []
+    for name in names[:: max(1, len(names) // count)][:count]:
+        queries.extend(name[:end] for end in range(1, min(len(name), 12) + 1))
+        queries.append(name[:6].replace(name[3], "x") if len(name) > 6 else name)
+    return queries
+
+
+def bench_autocomplete(results, scale):
+    names = make_company_names(scale)
+    build, index = _timed(lambda: StockNameIndex(names))
+    results.add("autocomplete", scale, "index_build", build * 1e3, "ms")
+
+    queries = _keystrokes(names)
+    selected = set(names[:20])
+    samples = []
+    for query in queries:
+        elapsed, _ = _timed(lambda: index.search(query, limit=10, exclude=selected))
+        samples.append(elapsed)
+    results.add_timings("autocomplete", scale, "query", samples)
+
+    # The original per-keystroke linear scan, for comparison
+    selected_list = list(selected)
+    linear = []
+    for query in queries:
+        elapsed, _ = _timed(lambda: sorted(
+            name for name in names if query.lower() in name.lower() and name not in selected_list
+        ))
+        linear.append(elapsed)
+    results.add_timings("autocomplete", scale, "linear_scan_baseline", linear)
+
+
+# --- Full-text search over report contents ---
+_TEXT_QUERIES = ("promoter pledge", "related party", "capex", "debt leverage cyclical", "working capital moat", "no such term")
+
+
+def bench_text_search(results, scale):
+    client = make_fake_client(scale)
+    engine = ReportSyncEngine(make_report_store(client))
+    engine.sync()
+
+    index = ReportTextIndex()
+    build, _ = _timed(lambda: index.update(engine.reports, engine.generation))
+    results.add("text_search", scale, "index_build", build * 1e3, "ms")
+
+    samples = []
+    for query in _TEXT_QUERIES * 3:
+        elapsed, _ = _timed(lambda: index.search(query, limit=20))
+        samples.append(elapsed)
+    results.add_timings("text_search", scale, "query", samples)
+
+    client.open(SHEET_NAME).rewrite_rows(0.01)
+    engine.sync()
+    delta, _ = _timed(lambda: index.update(engine.reports, engine.generation))
+    results.add("text_search", scale, "update_1pct_changed", delta * 1e3, "ms")
+
+
+# --- Report lookups behind fetch_data (the full path runs under AppTest below) ---
+def bench_report_lookup(results, scale):
+    client = make_fake_client(scale)
+    store = make_report_store(client)
+    engine = ReportSyncEngine(store)
+    engine.sync()
+    names = list(engine.reports)[:20]
+
+    samples = []
+    for name in names:
+        elapsed, _ = _timed(lambda: engine.reports.get(name))
+        samples.append(elapsed)
+    results.add_timings("report_lookup", scale, "snapshot_lookup", samples)
+
+    def first_view(name):
+        details = engine.reports[name][0]["output"]["report_details"]
+        return [details.get(part_key) for part_key in REPORT_PART_KEYS]
+    samples = []
+    for name in names:
+        elapsed, _ = _timed(lambda: first_view(name))
+        samples.append(elapsed)
+    results.add_timings("report_lookup", scale, "first_view_parse", samples)
+
+    # A snapshot miss on an indexed store: one bulk read per chunk, as fetch_data_batch does
+    with tempfile.TemporaryDirectory() as temp_dir:
+        copy_store(store, SQLiteReportStore(Path(temp_dir) / "reports.db", create=True))
+        sqlite_store = SQLiteReportStore(Path(temp_dir) / "reports.db")
+        chunks = [names[start:start + 8] for start in range(0, len(names), 8)]
+        samples = []
+        for chunk in chunks:
+            elapsed, _ = _timed(lambda: sqlite_store.get_reports(chunk))
+            samples.append(elapsed)
+        sqlite_store.close()
+    results.add_timings("report_lookup", scale, "sqlite_chunk_read", samples)
+
+
+# --- Full reruns through Streamlit's AppTest harness ---
+_ELEMENT_TYPES = ("header", "subheader", "markdown", "metric", "dataframe", "table", "expander", "toggle", "text")
+
+
+def _element_count(app):
+    return sum(len(app.get(element_type)) for element_type in _ELEMENT_TYPES)
+
+
+def bench_apptest(results, scale, reruns=5):
+    try:
+        import streamlit as st
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit is not installed; skipping AppTest benchmarks")
+        return
+
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    os.environ.update({
+        "GSPREAD_CLIENT_FACTORY": "benchmarks.synthetic_sheet:client_from_env",
+        "SYNTHETIC_SHEET_COMPANIES": str(scale),
+        "BACKGROUND_REFRESH": "0",
+        "REPORT_SNAPSHOT_PATH": str(Path(cache_dir) / "reports.snapshot"),
+        "STOCK_NAMES_SNAPSHOT_PATH": str(Path(cache_dir) / "stock_names.json"),
+        "REPORT_HISTORY_PATH": str(Path(cache_dir) / "report_history.db"),
+    })
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+    app = AppTest.from_file(str(APP_PATH), default_timeout=600)
+    cold, _ = _timed(app.run)
+    results.add("apptest", scale, "cold_first_run", cold * 1e3, "ms")
+
+    samples = [_timed(app.run)[0] for _ in range(reruns)]
+    results.add_timings("apptest", scale, "idle_rerun", samples)
+    results.add("apptest", scale, "idle_rerun_elements", _element_count(app), "elements")
+
+    names = make_company_names(scale)
+    samples = []
+    for query in ("N", "Na", "Nat", "Natc", "Natco"):
+        samples.append(_timed(lambda: app.text_input(key="autocomplete_input").input(query).run())[0])
+    results.add_timings("apptest", scale, "autocomplete_keystroke_rerun", samples)
+
+    app.session_state["selected_stocks_for_analysis"] = names[:20]
+    generate = next(button for button in app.button if button.label == "Generate Reports for Selected Stocks")
+    elapsed, _ = _timed(lambda: generate.click().run())
+    results.add("apptest", scale, "generate_20_reports", elapsed * 1e3, "ms")
+    results.add("apptest", scale, "generate_20_reports_elements", _element_count(app), "elements")
+
+    samples = [_timed(app.run)[0] for _ in range(reruns)]
+    results.add_timings("apptest", scale, "rerun_with_20_reports", samples)
+
+    def browse(name):
+        # Same state change as clicking the company's row in the Browse table
+        app.session_state["browse_company"] = name
+        return app.run()
+    samples = []
+    for name in names[1:1 + reruns]:
+        samples.append(_timed(lambda: browse(name))[0])
+    results.add_timings("apptest", scale, "browse_select_rerun", samples)
+
+    # Each page turn re-sends one page of the company table, not the whole list
+    samples = []
+    for _ in range(reruns):
+        page = next(number for number in app.number_input if number.key == "browse_page")
+        samples.append(_timed(lambda: page.increment().run())[0])
+    results.add_timings("apptest", scale, "browse_page_rerun", samples)
+
+    samples = []
+    for name in names[1:1 + reruns]:
+        samples.append(_timed(lambda: app.text_input(key="browse_query").input(name[:4]).run())[0])
+    results.add_timings("apptest", scale, "browse_filter_rerun", samples)
+
+
+# --- Process startup: a fresh interpreter running the app once ---
+_STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=600)
+app.run()
+first_run = time.perf_counter()
+app.run()
+print(json.dumps({
+    "import_streamlit": imported - started,
+    "first_run": first_run - imported,
+    "second_run": time.perf_counter() - first_run,
+    "sheets_libraries_imported": "gspread" in sys.modules or "oauth2client" in sys.modules,
+    "modules_loaded": len(sys.modules),
+}))
+"""
+
+
+def bench_startup(results, scale, runs=3):
+    # Each run is a new process, so nothing is left in st.cache_resource or sys.modules from the last one
+    cache_dir = tempfile.mkdtemp(prefix="bench-startup-")
+    env = dict(
+        os.environ,
+        GSPREAD_CLIENT_FACTORY="benchmarks.synthetic_sheet:client_from_env",
+        SYNTHETIC_SHEET_COMPANIES=str(scale),
+        BACKGROUND_REFRESH="0",
+        REPORT_SNAPSHOT_PATH=str(Path(cache_dir) / "reports.snapshot"),
+        STOCK_NAMES_SNAPSHOT_PATH=str(Path(cache_dir) / "stock_names.json"),
+        REPORT_HISTORY_PATH=str(Path(cache_dir) / "report_history.db"),
+        PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])),
+    )
+    samples = []
+    for _ in range(runs):
+        process_start = time.perf_counter()
+        output = subprocess.check_output([sys.executable, "-c", _STARTUP_SCRIPT, str(APP_PATH)], cwd=REPO_ROOT, env=env, text=True, stderr=subprocess.DEVNULL)
+        measured = json.loads(output.strip().splitlines()[-1])
+        measured["process_total"] = time.perf_counter() - process_start
+        samples.append(measured)
+
+    for metric in ("process_total", "import_streamlit", "first_run", "second_run"):
+        results.add_timings("startup", scale, metric, [sample[metric] for sample in samples])
+    results.add("startup", scale, "sheets_libraries_imported", float(samples[-1]["sheets_libraries_imported"]), "bool")
+    results.add("startup", scale, "modules_loaded", samples[-1]["modules_loaded"], "modules")
+
+
+BENCHMARKS = {
+    "transform": bench_transform,
+    "memory": bench_memory,
+    "autocomplete": bench_autocomplete,
+    "report_lookup": bench_report_lookup,
+    "text_search": bench_text_search,
+    "apptest": bench_apptest,
+    "startup": bench_startup,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--output", type=Path, default=REPO_ROOT / "benchmarks" / "results.json")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT) # the app loads assets/ relative to the working directory
+    results = Results()
+    for scale in args.scales:
+        for name in args.only:
+            BENCHMARKS[name](results, scale)
+
+    payload = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "max_rss_mb": _max_rss_mb(),
+        "results": results.records,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(payload, indent=2))
+    print(f"Wrote {len(results.records)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
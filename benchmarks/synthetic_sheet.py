@@ -0,0 +1,222 @@
+"""Synthetic result_stocks / stocks tabs and a fake gspread client that serves them.
+
+Reports follow the shape and size of the sample reports in assets/sample_reports.json
+(roughly 3-4 KB of JSON per part), so timings are representative of real rows.
+"""
+import functools
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from report_store import INVESTMENT_SCORE_KEY, REPORT_PART_KEYS, STOCK_NAME_COLUMN, GoogleSheetsReportStore
+from sheets_client import SheetsClient
+
+SHEET_NAME = "ai_agents" # the spreadsheet the fake client serves
+
+SUMMARY_FACTORS = [
+    "High Capex", "High R&D", "Risky Capex", "Risky R&D", "Dual Class Shares", "Wasteful FCF",
+    "Bad Industry", "Acquisition Growth", "High Debt", "Intense Competition",
+    "High SBC (Stock-Based Compensation)",
+]
+IRR_STYLES = ["Li Lu", "Nick Sleep", "Charlie Munger", "Warren Buffett"]
+_WORDS = (
+    "revenue margin growth guidance capex debt promoter pledge related party competition moat "
+    "pricing regulatory approval export domestic segment cash flow working capital dividend "
+    "valuation earnings volatility management credibility forecast execution acquisition "
+    "subsidiary inventory receivables leverage return equity capital allocation cyclical demand"
+).split()
+_NAME_PARTS = (
+    "Natco Tata Sun Adani Bharat Hindustan Reliance Apex Zenith Vardhman Kaveri Sahyadri Indo "
+    "Global Pioneer Sterling Orient Deccan Coromandel Shree Jai Om Metro Nova Prime Alpha"
+).split()
+_NAME_SECTORS = (
+    "Pharma Motors Steel Textiles Chemicals Foods Power Cement Finance Infra Logistics Polymers "
+    "Electricals Auto Components Agro Paper Glass Software Realty Hotels"
+).split()
+
+
+def _sentences(rng, words):
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def make_company_names(count, seed=0):
+    rng = random.Random(seed)
+    names = []
+    seen = set()
+    while len(names) < count:
+        name = f"{rng.choice(_NAME_PARTS)} {rng.choice(_NAME_SECTORS)}"
+        if name in seen:
+            name = f"{name} {rng.choice(_NAME_SECTORS)} {len(names)}"
+        seen.add(name)
+        names.append(f"{name} {rng.choice(['Ltd', 'Limited', 'Industries Ltd'])}")
+    return names
+
+
+def make_row(company_name, rng):
+    part1 = {
+        "1. Future Forecast vs. Actuals (Past 5 Years)": _sentences(rng, 110),
+        "2. Management Guidance Analysis": {
+            "Current Guidance": _sentences(rng, 75),
+            "Historical Comparison": {
+                "Revenue": _sentences(rng, 80),
+                "Bottom Line": _sentences(rng, 85),
+                "CapEx/Strategic Initiatives": _sentences(rng, 80),
+            },
+            "Overall Credibility Assessment": _sentences(rng, 70),
+        },
+    }
+    part2 = {
+        "summary_table": [
+            {
+                "Factor": factor,
+                "Assessment": rng.choice(["YES", "NO", "N/A"]),
+                "Data": _sentences(rng, 12),
+                "Justification": _sentences(rng, 22),
+            }
+            for factor in SUMMARY_FACTORS
+        ],
+        "Overall Risk Assessment": _sentences(rng, 55),
+    }
+    part3 = {
+        "1. Overall Investigation (Li Lu Style)": _sentences(rng, 85),
+        "2. Business Model and Moat (Nick Sleep Style)": _sentences(rng, 95),
+        "3. Risks and Quality of Business (Charlie Munger Style)": _sentences(rng, 75),
+        "4. Owner's Earnings and Margin of Safety (Warren Buffett Style)": {
+            "Owner's Earnings and Margin of Safety Analysis": _sentences(rng, 75),
+            "IRR Projections": {style: f"{rng.randint(4, 22)}% IRR (Base Case)" for style in IRR_STYLES},
+            "Fat Pitch Analysis": _sentences(rng, 55),
+        },
+        "5. 3-10 Year Hold Scenarios": _sentences(rng, 90),
+    }
+    # get_all_records() hands back the report columns as JSON text and the score as a number
+    return {
+        "company_name": company_name,
+        REPORT_PART_KEYS[0]: json.dumps(part1),
+        REPORT_PART_KEYS[1]: json.dumps(part2),
+        REPORT_PART_KEYS[2]: json.dumps(part3),
+        INVESTMENT_SCORE_KEY: rng.randint(5, 95),
+    }
+
+
+def make_rows(company_names, seed=0):
+    rng = random.Random(seed)
+    return [make_row(name, rng) for name in company_names]
+
+
+# --- Fake gspread client ---
+class FakeAPIError(Exception):
+    """Stand-in for gspread.exceptions.APIError; SheetsClient only looks at .code."""
+
+    def __init__(self, code):
+        super().__init__(f"Fake Sheets API error {code}")
+        self.code = code
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, header, rows):
+        self.spreadsheet = spreadsheet
+        self.header = header
+        self.rows = rows # list of dicts keyed by header
+
+    def get_all_records(self):
+        self.spreadsheet.call()
+        if self.spreadsheet.fresh_records:
+            # Decoded afresh, like a real API response, so no strings are shared with the fake
+            return json.loads(json.dumps(self.rows))
+        return [dict(row) for row in self.rows]
+
+    def row_values(self, row_number):
+        self.spreadsheet.call()
+        if row_number == 1:
+            return list(self.header)
+        return [self.rows[row_number - 2].get(column, "") for column in self.header]
+
+    def col_values(self, col_number):
+        self.spreadsheet.call()
+        column = self.header[col_number - 1]
+        return [column] + [row.get(column, "") for row in self.rows]
+
+
+class FakeSpreadsheet:
+    def __init__(self, result_rows, stock_names, latency=0.0, results_tab="result_stocks", stocks_tab="stocks", fresh_records=False):
+        self.latency = latency
+        self.fresh_records = fresh_records # True for memory measurements; costs a JSON round trip per read
+        self.calls = 0
+        self.fail_next = [] # status codes to raise on upcoming calls, e.g. [429, 503]
+        self._last_update_time = datetime.now(timezone.utc).isoformat()
+        self._lock = threading.Lock()
+        self.worksheets = {
+            results_tab: FakeWorksheet(self, ["company_name", *REPORT_PART_KEYS, INVESTMENT_SCORE_KEY], result_rows),
+            stocks_tab: FakeWorksheet(self, [STOCK_NAME_COLUMN], [{STOCK_NAME_COLUMN: name} for name in stock_names]),
+        }
+
+    def call(self):
+        # Every API round trip: count it, simulate network latency and injected failures
+        with self._lock:
+            self.calls += 1
+            failure = self.fail_next.pop(0) if self.fail_next else None
+        if self.latency:
+            time.sleep(self.latency)
+        if failure:
+            raise FakeAPIError(failure)
+
+    def worksheet(self, tab_name):
+        self.call()
+        return self.worksheets[tab_name]
+
+    def get_lastUpdateTime(self):
+        self.call() # a Drive API request in gspread
+        return self._last_update_time
+
+    def touch(self):
+        self._last_update_time = datetime.now(timezone.utc).isoformat()
+
+    def rewrite_rows(self, fraction, seed=1):
+        # Regenerate a share of the result rows, as if the agents re-ran those companies
+        rng = random.Random(seed)
+        rows = self.worksheets["result_stocks"].rows
+        for index in rng.sample(range(len(rows)), max(1, int(len(rows) * fraction))):
+            rows[index] = make_row(rows[index]["company_name"], rng)
+        self.touch()
+
+
+class FakeGspreadClient:
+    def __init__(self, spreadsheets):
+        self.spreadsheets = spreadsheets
+
+    def open(self, sheet_name):
+        return self.spreadsheets[sheet_name]
+
+
+def make_fake_client(companies, sheet_name=SHEET_NAME, seed=0, latency=0.0, extra_stock_names=0, fresh_records=False):
+    # The stocks tab is usually a superset of the companies that already have reports
+    company_names = make_company_names(companies + extra_stock_names, seed=seed)
+    rows = make_rows(company_names[:companies], seed=seed)
+    return FakeGspreadClient({sheet_name: FakeSpreadsheet(rows, company_names, latency=latency, fresh_records=fresh_records)})
+
+
+def make_report_store(client, sheet_name=SHEET_NAME):
+    # The production Sheets store, reading through SheetsClient from a fake client
+    return GoogleSheetsReportStore(SheetsClient(lambda: client), sheet_name, "result_stocks", "stocks")
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_fake_client(companies, seed, latency):
+    return make_fake_client(companies, seed=seed, latency=latency)
+
+
+def client_from_env():
+    """GSPREAD_CLIENT_FACTORY entry point: "benchmarks.synthetic_sheet:client_from_env".
+
+    Sized by SYNTHETIC_SHEET_COMPANIES (default 100), SYNTHETIC_SHEET_SEED and
+    SYNTHETIC_SHEET_LATENCY (seconds per API call).
+    """
+    return _cached_fake_client(
+        int(os.environ.get("SYNTHETIC_SHEET_COMPANIES", "100")),
+        int(os.environ.get("SYNTHETIC_SHEET_SEED", "0")),
+        float(os.environ.get("SYNTHETIC_SHEET_LATENCY", "0")),
+    )
@@ -0,0 +1,114 @@
+import math
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+
+from report_analytics import COMPANY_COLUMN, FLAGS_COLUMN, PERCENTILE_COLUMN, SCORE_COLUMN
+
+OTHER_LETTER = "#" # bucket for names that don't start with A-Z
+
+
+def first_letter(name):
+    letter = name.lstrip()[:1].upper()
+    return letter if "A" <= letter <= "Z" else OTHER_LETTER
+
+
+def _number(value):
+    # NaN/None/"N/A" -> None, so a page of rows stays plain Python
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+@dataclass
+class BrowsePage:
+    rows: list # one {column: value} dict per company on this page
+    companies: tuple # the same companies, in page order
+    total: int # companies matching the filters, across every page
+    page: int # 1-based, clamped to the pages that exist
+    pages: int
+
+
+class CompanyBrowseIndex:
+    """Every browsable company, sorted once per snapshot, with filtering and paging done server side.
+
+    Names are kept in case-insensitive order next to their score, percentile
+    and risk flag count from the score table. A filter (name substring, first
+    letter, score range) resolves to a list of positions into that order and
+    is cached, so flipping through pages only slices it and builds the rows
+    for the visible page.
+    """
+
+    def __init__(self, company_names, score_table=None, cache_size=32):
+        self.names = tuple(sorted(dict.fromkeys(company_names), key=lambda name: (name.casefold(), name)))
+        self._positions = {name: position for position, name in enumerate(self.names)}
+        self._folded = [name.casefold() for name in self.names]
+        self._letters = defaultdict(list)
+        for position, name in enumerate(self.names):
+            self._letters[first_letter(name)].append(position)
+        self.letters = tuple(sorted(self._letters, key=lambda letter: (letter == OTHER_LETTER, letter)))
+
+        summaries = {}
+        if score_table is not None and not score_table.empty:
+            aligned = score_table.reindex(list(self.names))
+            for column in (SCORE_COLUMN, PERCENTILE_COLUMN, FLAGS_COLUMN):
+                summaries[column] = [_number(value) for value in aligned[column].tolist()]
+        self._scores = summaries.get(SCORE_COLUMN, [None] * len(self.names))
+        self._percentiles = summaries.get(PERCENTILE_COLUMN, [None] * len(self.names))
+        self._flags = [None if flags is None else int(flags) for flags in summaries.get(FLAGS_COLUMN, [None] * len(self.names))]
+        scores = [score for score in self._scores if score is not None]
+        self.score_bounds = (min(scores), max(scores)) if scores else None # read on every rerun, so worked out once here
+
+        self._cache_size = cache_size
+        self._filtered = OrderedDict() # (query, letter, score_range) -> positions, least recently used first
+        self._lock = threading.Lock() # the index is shared by every session
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, company_name):
+        return company_name in self._positions
+
+    def _filter(self, query, letter, score_range):
+        positions = self._letters.get(letter, []) if letter else range(len(self.names))
+        if query:
+            folded = self._folded
+            positions = [position for position in positions if query in folded[position]]
+        if score_range is not None:
+            low, high = score_range
+            scores = self._scores
+            positions = [position for position in positions if scores[position] is not None and low <= scores[position] <= high]
+        return positions if isinstance(positions, range) else tuple(positions)
+
+    def filter(self, query="", letter=None, score_range=None):
+        """Positions (in sorted order) of the companies matching every filter."""
+        key = (query.strip().casefold(), letter or None, tuple(score_range) if score_range is not None else None)
+        with self._lock:
+            positions = self._filtered.get(key)
+            if positions is not None:
+                self._filtered.move_to_end(key)
+                return positions
+        positions = self._filter(*key)
+        with self._lock:
+            self._filtered[key] = positions
+            while len(self._filtered) > self._cache_size:
+                self._filtered.popitem(last=False)
+        return positions
+
+    def page(self, page, page_size, query="", letter=None, score_range=None):
+        positions = self.filter(query, letter, score_range)
+        pages = max(1, math.ceil(len(positions) / page_size))
+        page = min(max(1, page), pages)
+        visible = positions[(page - 1) * page_size:page * page_size]
+        rows = [
+            {
+                COMPANY_COLUMN: self.names[position],
+                SCORE_COLUMN: self._scores[position],
+                PERCENTILE_COLUMN: self._percentiles[position],
+                FLAGS_COLUMN: self._flags[position],
+            }
+            for position in visible
+        ]
+        return BrowsePage(rows, tuple(row[COMPANY_COLUMN] for row in rows), len(positions), page, pages)
@@ -0,0 +1,60 @@
+import json
+import re
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# Dropped from the end of a name, so "Natco Pharma Limited" and "natco pharma" share a key
+_LEGAL_SUFFIXES = {"ltd", "limited", "pvt", "private", "inc", "incorporated", "corp", "corporation", "co", "company", "plc"}
+
+
+def normalize_company_name(name):
+    """Case, spacing, punctuation and "Ltd/Limited" insensitive key for a company name."""
+    words = _NON_ALNUM.split(str(name).casefold().replace("&", " and "))
+    words = [word for word in words if word]
+    if words and words[0] == "the":
+        words = words[1:]
+    while len(words) > 1 and words[-1] in _LEGAL_SUFFIXES:
+        words.pop()
+    return "".join(words) # no separators: "NatcoPharma" and "Natco Pharma" match too
+
+
+def load_aliases(path):
+    # Optional {"alias or ticker": "Canonical Name"} JSON file; a missing or broken file means no aliases
+    try:
+        with open(path, encoding="utf-8") as f:
+            aliases = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {str(alias): str(name) for alias, name in aliases.items()} if isinstance(aliases, dict) else {}
+
+
+class CompanyNameResolver:
+    """Maps any spelling of a company name, or a listed alias such as its ticker, to one canonical name.
+
+    Built once per name list. Names that have a report come first, so a variant
+    resolves to the spelling the report is stored under; then names from the
+    stocks tab, then the aliases (e.g. NSE symbols from assets/company_aliases.json).
+    An alias never takes over a key that already belongs to a company name.
+    """
+
+    def __init__(self, report_names, stock_names=(), aliases=None):
+        self._exact = {}
+        self._keys = {}
+        for name in (*report_names, *stock_names):
+            canonical = self._keys.setdefault(normalize_company_name(name), name)
+            self._exact.setdefault(name, canonical) # a stocks-tab spelling still lands on the report's
+
+        for alias, name in (aliases or {}).items():
+            canonical = self._keys.get(normalize_company_name(name), name)
+            self._keys.setdefault(normalize_company_name(alias), canonical)
+
+    def __len__(self):
+        return len(self._exact)
+
+    def resolve(self, name):
+        """Canonical name for `name`, or None if nothing matches."""
+        if not name:
+            return None
+        canonical = self._exact.get(name)
+        if canonical is None:
+            canonical = self._keys.get(normalize_company_name(name))
+        return canonical
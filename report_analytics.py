@@ -0,0 +1,80 @@
+import pandas as pd
+
+from report_store import INVESTMENT_SCORE_KEY, REPORT_PART_KEYS
+
+SCORE_COLUMN = "Investment Score"
+PERCENTILE_COLUMN = "Percentile"
+FLAGS_COLUMN = "Risk Flags" # number of summary_table factors assessed YES
+COMPANY_COLUMN = "Company"
+_PART2_KEY = REPORT_PART_KEYS[1]
+
+
+def _summary_assessments(report_details):
+    part2 = report_details.get(_PART2_KEY, {})
+    summary_table = part2.get("summary_table") if isinstance(part2, dict) else None
+    if not isinstance(summary_table, list):
+        return {}
+    return {
+        str(row["Factor"]).strip(): str(row.get("Assessment", "")).strip().upper()
+        for row in summary_table if isinstance(row, dict) and row.get("Factor")
+    }
+
+
+def build_score_table(reports):
+    """One row per company: score, percentile rank and every Part 2 summary_table assessment.
+
+    `reports` is a {company_name: [report]} mapping. Building it walks every
+    report once; everything after that (sorting, filtering, ranking) is done
+    on whole columns.
+    """
+    records = []
+    for company_name, report_data_list in reports.items():
+        if not report_data_list:
+            continue
+        output = report_data_list[0].get("output", {})
+        records.append({
+            COMPANY_COLUMN: company_name,
+            SCORE_COLUMN: output.get(INVESTMENT_SCORE_KEY),
+            **_summary_assessments(output.get("report_details", {})),
+        })
+    table = pd.DataFrame.from_records(records)
+    if table.empty:
+        return pd.DataFrame(columns=[SCORE_COLUMN, PERCENTILE_COLUMN, FLAGS_COLUMN]).rename_axis(COMPANY_COLUMN)
+
+    table = table.set_index(COMPANY_COLUMN)
+    table[SCORE_COLUMN] = pd.to_numeric(table[SCORE_COLUMN], errors="coerce") # "N/A" becomes NaN
+    # Share of companies scoring at or below this one; companies without a score get no rank
+    table.insert(1, PERCENTILE_COLUMN, table[SCORE_COLUMN].rank(pct=True, method="max") * 100)
+    factor_columns = factor_names(table)
+    table.insert(2, FLAGS_COLUMN, table[factor_columns].eq("YES").sum(axis=1))
+    return table
+
+
+def factor_names(table):
+    return [column for column in table.columns if column not in (SCORE_COLUMN, PERCENTILE_COLUMN, FLAGS_COLUMN)]
+
+
+def filter_score_table(table, score_range=None, min_percentile=None, exclude_flagged=(), name_query="", sort_by=SCORE_COLUMN, ascending=False):
+    mask = pd.Series(True, index=table.index)
+    if score_range is not None:
+        mask &= table[SCORE_COLUMN].between(*score_range)
+    if min_percentile:
+        mask &= table[PERCENTILE_COLUMN] >= min_percentile
+    for factor in exclude_flagged:
+        if factor in table.columns:
+            mask &= table[factor].ne("YES")
+    if name_query:
+        mask &= table.index.str.contains(name_query, case=False, regex=False)
+    filtered = table[mask]
+    if sort_by == COMPANY_COLUMN:
+        return filtered.sort_index(ascending=ascending)
+    return filtered.sort_values(sort_by, ascending=ascending, na_position="last", kind="stable")
+
+
+def percentile_of(table, company_name):
+    # Hash lookup into the precomputed table; None when the company has no numeric score
+    try:
+        percentile = table.at[company_name, PERCENTILE_COLUMN]
+    except KeyError:
+        return None
+    return None if pd.isna(percentile) else float(percentile)
@@ -0,0 +1,141 @@
+import csv
+import importlib.util
+import io
+import json
+
+from report_store import INVESTMENT_SCORE_KEY, REPORT_PART_KEYS, parse_report_part
+
+# Excel export is optional; openpyxl is only imported once an Excel file is actually written
+HAS_OPENPYXL = importlib.util.find_spec("openpyxl") is not None
+
+COMPANY_COLUMN = "company_name"
+SCORE_COLUMN = "investment_score"
+
+# Label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSON Lines": ("jsonl", "application/x-ndjson"),
+}
+if HAS_OPENPYXL:
+    EXPORT_FORMATS["Excel"] = ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+def _part(report_details, part_key):
+    # Parse from the raw text without memoising, so an export doesn't leave every report parsed in the shared cache
+    is_parsed = getattr(report_details, "is_parsed", None)
+    if is_parsed is not None and not is_parsed(part_key):
+        return parse_report_part(report_details.raw(part_key))
+    return report_details.get(part_key, {})
+
+
+def _short_part_name(part_key):
+    return part_key.split(":", 1)[0] # "Part 1: Corporate ..." -> "Part 1"
+
+
+def _cell(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def flatten_part(value, prefix):
+    """Yield (column, value) pairs for one report part, one column per leaf.
+
+    Nested keys are joined with "/". Rows of the Part 2 summary_table are keyed
+    by their Factor, so "Part 2/summary_table/High Debt/Assessment" lines up
+    across companies.
+    """
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from flatten_part(child, f"{prefix}/{key}")
+    elif isinstance(value, list) and value and all(isinstance(row, dict) and row.get("Factor") for row in value):
+        for row in value:
+            for key, child in row.items():
+                if key != "Factor":
+                    yield f"{prefix}/{row['Factor']}/{key}", _cell(child)
+    else:
+        yield prefix, _cell(value)
+
+
+def _output(report_data_list):
+    return report_data_list[0].get("output", {})
+
+
+def flat_record(company_name, report_data_list):
+    output = _output(report_data_list)
+    report_details = output.get("report_details", {})
+    record = {COMPANY_COLUMN: company_name, SCORE_COLUMN: _cell(output.get(INVESTMENT_SCORE_KEY))}
+    for part_key in REPORT_PART_KEYS:
+        part = _part(report_details, part_key)
+        if part:
+            record.update(flatten_part(part, _short_part_name(part_key)))
+    return record
+
+
+def nested_record(company_name, report_data_list):
+    output = _output(report_data_list)
+    report_details = output.get("report_details", {})
+    record = {COMPANY_COLUMN: company_name, SCORE_COLUMN: output.get(INVESTMENT_SCORE_KEY)}
+    for part_key in REPORT_PART_KEYS:
+        record[part_key] = _part(report_details, part_key)
+    return record
+
+
+def _flat_records(reports):
+    # One pass over the reports: every company's flattened row, plus the union of their columns in first-seen order
+    columns = {COMPANY_COLUMN: None, SCORE_COLUMN: None}
+    records = []
+    for company_name, report_data_list in reports:
+        record = flat_record(company_name, report_data_list)
+        columns.update(dict.fromkeys(record))
+        records.append(record)
+    return list(columns), records
+
+
+def write_jsonl(reports, file):
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="\n")
+    for company_name, report_data_list in reports:
+        text.write(json.dumps(nested_record(company_name, report_data_list), ensure_ascii=False, default=str))
+        text.write("\n")
+    text.flush()
+    text.detach()
+
+
+def write_csv(reports, file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="") # BOM so Excel picks up UTF-8
+    columns, records = _flat_records(reports)
+    writer = csv.DictWriter(text, fieldnames=columns, restval="")
+    writer.writeheader()
+    writer.writerows(records)
+    text.flush()
+    text.detach()
+
+
+def write_xlsx(reports, file):
+    from openpyxl import Workbook
+
+    columns, records = _flat_records(reports)
+    workbook = Workbook(write_only=True) # rows go straight to the zip stream instead of a sheet held in memory
+    sheet = workbook.create_sheet("Reports")
+    sheet.append(columns)
+    for record in records:
+        sheet.append([record.get(column) for column in columns])
+    workbook.save(file)
+
+
+_WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "xlsx": write_xlsx}
+
+
+def export_reports(export_format, reports):
+    """Build an export in memory and return its bytes.
+
+    `reports` is an iterable of (company_name, report_data_list) pairs and is
+    read once; every part is parsed once. The whole file is held in memory:
+    st.download_button keeps the bytes it's given in Streamlit's in-memory
+    media storage, so writing to disk first would only add a copy. CSV and
+    Excel also hold every flattened row until the columns are known.
+    """
+    extension, _ = EXPORT_FORMATS[export_format]
+    file = io.BytesIO()
+    _WRITERS[extension](reports, file)
+    return file.getvalue()
@@ -0,0 +1,225 @@
+import difflib
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from report_export import flatten_part
+from report_store import INVESTMENT_SCORE_KEY, REPORT_PART_KEYS, parse_report_part
+
+# Kinds of history entries. "baseline" is the first recording of an empty history, so
+# switching history on doesn't make every company show up as recently updated.
+BASELINE, ADDED, CHANGED, REMOVED = "baseline", "added", "changed", "removed"
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+@dataclass
+class HistoryVersion:
+    id: int
+    company_name: str
+    recorded_at: float
+    change: str
+    row_hash: str
+    investment_score: object
+    part_hashes: list # content hash per REPORT_PART_KEYS entry; empty for a removal
+
+
+@dataclass
+class PartDiff:
+    part_key: str
+    status: str # "unchanged", "changed", "added" or "removed"
+    rows: list = field(default_factory=list) # (field, before, after) for each value that differs
+
+
+@dataclass
+class ReportDiff:
+    company_name: str
+    before: HistoryVersion
+    after: HistoryVersion
+    parts: list
+
+    @property
+    def score_changed(self):
+        return self.before.investment_score != self.after.investment_score
+
+
+def _part_text(report_details, part_key):
+    raw = getattr(report_details, "raw", None)
+    value = raw(part_key) if raw is not None else report_details.get(part_key, "")
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _compressed_body(report_details, part_key, text):
+    # Bodies already held zlib-compressed (in memory or in the snapshot) are stored as they are
+    source = getattr(report_details, "raw_source", None)
+    if hasattr(source, "compressed"):
+        return bytes(source.compressed(part_key))
+    return zlib.compress(text.encode("utf-8", "surrogatepass"), 1)
+
+
+def _field_rows(before_text, after_text):
+    before, after = parse_report_part(before_text), parse_report_part(after_text)
+    if isinstance(before, (dict, list)) and isinstance(after, (dict, list)):
+        # Compare leaf by leaf, with the same column paths the CSV export uses
+        before_fields = {path.lstrip("/"): value for path, value in flatten_part(before, "")}
+        after_fields = {path.lstrip("/"): value for path, value in flatten_part(after, "")}
+        return [
+            (path, before_fields.get(path), after_fields.get(path))
+            for path in dict.fromkeys([*before_fields, *after_fields])
+            if before_fields.get(path) != after_fields.get(path)
+        ]
+    # Plain text (or malformed JSON): line by line
+    matcher = difflib.SequenceMatcher(None, before_text.splitlines(), after_text.splitlines(), autojunk=False)
+    return [
+        (f"line {i1 + 1}", "\n".join(matcher.a[i1:i2]) or None, "\n".join(matcher.b[j1:j2]) or None)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+    ]
+
+
+class ReportHistory:
+    """Append-only local history of every report version, deduplicated by content hash.
+
+    Each time the report snapshot changes, record() appends one version row per
+    company whose sheet row hash differs from its latest recorded version; part
+    bodies are stored once per distinct content hash, so an edit to one part
+    only adds that part. Nothing is ever updated or deleted, so a rewritten
+    result_stocks tab doesn't lose the previous analysis.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.recorded_generation = None # sync engine generation last recorded
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bodies ("
+                " content_hash TEXT PRIMARY KEY,"
+                " body BLOB NOT NULL)" # zlib-compressed part text
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS versions ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " company_name TEXT NOT NULL,"
+                " recorded_at REAL NOT NULL,"
+                " change TEXT NOT NULL,"
+                " row_hash TEXT,"
+                " investment_score TEXT,"
+                " part_hashes TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS versions_company ON versions (company_name, id)")
+            # Latest row hash per company (None once removed): the index every record() diffs against
+            cursor = self._conn.execute(
+                "SELECT company_name, row_hash FROM versions"
+                " WHERE id IN (SELECT MAX(id) FROM versions GROUP BY company_name)"
+            )
+            self._latest = dict(cursor)
+
+    def __len__(self):
+        return sum(1 for row_hash in self._latest.values() if row_hash is not None)
+
+    def record(self, reports, row_hashes, generation=None):
+        """Append a version for every company that changed since its last one; returns how many."""
+        with self._lock:
+            if generation is not None and generation == self.recorded_generation:
+                return 0
+            recorded_at = time.time()
+            baseline = not self._latest
+            versions, bodies = [], {}
+            for company_name, row_hash in row_hashes.items():
+                latest = self._latest.get(company_name)
+                if latest == row_hash or not reports.get(company_name):
+                    continue
+                output = reports[company_name][0]["output"]
+                report_details = output["report_details"]
+                part_hashes = []
+                for part_key in REPORT_PART_KEYS:
+                    text = _part_text(report_details, part_key)
+                    digest = content_hash(text)
+                    if digest not in bodies:
+                        bodies[digest] = _compressed_body(report_details, part_key, text)
+                    part_hashes.append(digest)
+                change = BASELINE if baseline else ADDED if latest is None else CHANGED
+                versions.append((company_name, recorded_at, change, row_hash,
+                                 json.dumps(output.get(INVESTMENT_SCORE_KEY)), json.dumps(part_hashes)))
+            for company_name, latest in self._latest.items():
+                if latest is not None and company_name not in row_hashes:
+                    versions.append((company_name, recorded_at, REMOVED, None, None, "[]"))
+
+            if versions:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO bodies (content_hash, body) VALUES (?, ?)", bodies.items()
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO versions (company_name, recorded_at, change, row_hash, investment_score, part_hashes)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        versions,
+                    )
+                for company_name, _, _, row_hash, _, _ in versions:
+                    self._latest[company_name] = row_hash
+            self.recorded_generation = generation
+            return len(versions)
+
+    @staticmethod
+    def _version(row):
+        version_id, company_name, recorded_at, change, row_hash, investment_score, part_hashes = row
+        return HistoryVersion(
+            version_id, company_name, recorded_at, change, row_hash,
+            json.loads(investment_score) if investment_score is not None else None,
+            json.loads(part_hashes),
+        )
+
+    def versions(self, company_name):
+        """Every recorded version of one company, newest first."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id, company_name, recorded_at, change, row_hash, investment_score, part_hashes"
+                " FROM versions WHERE company_name = ? ORDER BY id DESC",
+                (company_name,),
+            )
+            return [self._version(row) for row in cursor]
+
+    def recent_changes(self, limit=20):
+        """Latest version of the most recently added, changed or removed companies, newest first."""
+        with self._lock:
+            # SQLite takes the bare columns from the row holding MAX(id)
+            cursor = self._conn.execute(
+                "SELECT MAX(id), company_name, recorded_at, change, row_hash, investment_score, part_hashes"
+                " FROM versions WHERE change != ? GROUP BY company_name ORDER BY MAX(id) DESC LIMIT ?",
+                (BASELINE, limit),
+            )
+            return [self._version(row) for row in cursor]
+
+    def part_text(self, digest):
+        with self._lock:
+            found = self._conn.execute("SELECT body FROM bodies WHERE content_hash = ?", (digest,)).fetchone()
+        return zlib.decompress(found[0]).decode("utf-8", "surrogatepass") if found else ""
+
+    def diff(self, before, after):
+        """What changed between two versions of a company; only parts whose hashes differ are loaded."""
+        parts = []
+        for i, part_key in enumerate(REPORT_PART_KEYS):
+            before_hash = before.part_hashes[i] if before.part_hashes else None
+            after_hash = after.part_hashes[i] if after.part_hashes else None
+            if before_hash == after_hash:
+                parts.append(PartDiff(part_key, "unchanged"))
+            elif before_hash is None:
+                parts.append(PartDiff(part_key, "added"))
+            elif after_hash is None:
+                parts.append(PartDiff(part_key, "removed"))
+            else:
+                rows = _field_rows(self.part_text(before_hash), self.part_text(after_hash))
+                parts.append(PartDiff(part_key, "changed", rows))
+        return ReportDiff(after.company_name, before, after, parts)
+
+    def close(self):
+        self._conn.close()
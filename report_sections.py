@@ -0,0 +1,117 @@
+import hashlib
+import json
+
+import pandas as pd
+
+from report_store import REPORT_PART_KEYS
+
+# Toggle labels for each part, in display order
+SECTION_TITLES = {
+    REPORT_PART_KEYS[0]: "**Part 1: Corporate Governance and Management Credibility Assessment**",
+    REPORT_PART_KEYS[1]: "**Part 2: Operational Risk & Business Quality**",
+    REPORT_PART_KEYS[2]: "**Part 3: Holistic Investment Investigation**",
+}
+
+# Block kinds, each rendered with one Streamlit call
+MARKDOWN = "markdown" # st.markdown(text)
+WRITE = "write" # st.write(value), for anything that isn't text
+DATAFRAME = "dataframe" # st.dataframe(df)
+TABLE = "table" # st.table(df)
+
+
+def part_content_hash(report_details, part_key):
+    # Hash of what the section would show; taken from the raw sheet text when we still have it
+    content_hash = getattr(report_details, "content_hash", None)
+    if content_hash is not None:
+        return content_hash(part_key)
+    part = report_details.get(part_key, {})
+    encoded = json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class _Blocks:
+    """Collects render blocks, merging runs of markdown into a single element."""
+
+    def __init__(self):
+        self.blocks = []
+        self._markdown = []
+
+    def markdown(self, text):
+        self._markdown.append(text)
+
+    def write(self, value):
+        if isinstance(value, str):
+            self.markdown(value) # st.write renders strings as markdown anyway
+        else:
+            self._flush()
+            self.blocks.append((WRITE, value))
+
+    def frame(self, kind, df):
+        self._flush()
+        self.blocks.append((kind, df))
+
+    def _flush(self):
+        if self._markdown:
+            self.blocks.append((MARKDOWN, "\n\n".join(self._markdown)))
+            self._markdown = []
+
+    def done(self):
+        self._flush()
+        return self.blocks
+
+
+def _nested_sections(part, blocks, render_sub_dict):
+    for k, v in part.items():
+        blocks.markdown(f"### {k}")
+        if isinstance(v, dict):
+            for sub_k, sub_v in v.items():
+                blocks.markdown(f"**{sub_k}**")
+                if isinstance(sub_v, dict):
+                    render_sub_dict(sub_k, sub_v)
+                else:
+                    blocks.write(sub_v)
+        else:
+            blocks.write(v)
+
+
+def _part1_blocks(part, blocks):
+    def deep_items(_, sub_v):
+        blocks.markdown("\n".join(f"- **{deep_k}:** {deep_v}" for deep_k, deep_v in sub_v.items()))
+    _nested_sections(part, blocks, deep_items)
+
+
+def _part2_blocks(part, blocks):
+    blocks.markdown("### Summary Table")
+    summary_table = part.get("summary_table")
+    if isinstance(summary_table, list) and all(isinstance(i, dict) for i in summary_table):
+        blocks.frame(DATAFRAME, pd.DataFrame(summary_table))
+    elif summary_table:
+        blocks.markdown("Summary table data is not in the expected tabular format:")
+        blocks.write(summary_table)
+    else:
+        blocks.markdown("No summary table data available or it is empty.")
+
+    blocks.markdown("### Overall Risk Assessment")
+    blocks.write(part.get("Overall Risk Assessment", "N/A"))
+
+
+def _part3_blocks(part, blocks):
+    def irr_table(sub_k, sub_v):
+        if sub_k == "IRR Projections" and all(isinstance(val, str) for val in sub_v.values()):
+            blocks.frame(TABLE, pd.DataFrame.from_dict(sub_v, orient="index", columns=["Scenario"]).rename_axis("Investment Style"))
+        else:
+            blocks.write(sub_v)
+    _nested_sections(part, blocks, irr_table)
+
+
+_PART_BUILDERS = dict(zip(REPORT_PART_KEYS, (_part1_blocks, _part2_blocks, _part3_blocks)))
+
+
+def build_section_blocks(part_key, part):
+    """Flatten one report part into a short list of (kind, value) render blocks."""
+    blocks = _Blocks()
+    if isinstance(part, dict):
+        _PART_BUILDERS[part_key](part, blocks)
+    else:
+        blocks.write(part) # malformed JSON is shown as the raw text
+    return blocks.done()
@@ -0,0 +1,195 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+
+from report_store import (
+    REPORT_PART_KEYS,
+    LazyReportDetails,
+    empty_part_mask,
+    is_blank_part,
+    make_company_report,
+    part_has_content,
+    raw_text_length,
+)
+
+# File layout: magic, 8-byte header length, JSON header, then zlib blobs (one per report part).
+# The header holds the scalar columns (name, score, row hash, which parts are empty) and each
+# blob's offset/length, so a restart only reads the header; report bodies are decompressed
+# when first viewed.
+SNAPSHOT_MAGIC = b"UEQSNAP1"
+SNAPSHOT_FORMAT_VERSION = 1
+_HEADER_LENGTH = struct.Struct(">Q")
+
+
+class SnapshotPartSource(Mapping):
+    """Raw Part 1-3 text for one company, decompressed from the snapshot on access."""
+
+    __slots__ = ("_snapshot", "_blobs", "_empty", "raw_length")
+
+    def __init__(self, snapshot, blobs, empty=None, raw_length=None):
+        self._snapshot = snapshot
+        self._blobs = blobs # [[offset, length], ...] in REPORT_PART_KEYS order
+        self._empty = empty # empty_part_mask bits; None for snapshots written before it was recorded
+        self.raw_length = raw_length # likewise None when the snapshot predates it
+
+    def __getitem__(self, part_key):
+        return zlib.decompress(self.compressed(part_key)).decode("utf-8")
+
+    def __iter__(self):
+        return iter(REPORT_PART_KEYS)
+
+    def __len__(self):
+        return len(REPORT_PART_KEYS)
+
+    def compressed(self, part_key):
+        offset, length = self._blobs[REPORT_PART_KEYS.index(part_key)]
+        return self._snapshot.read_blob(offset, length)
+
+    def has_content(self, part_key):
+        if self._empty is None:
+            return not is_blank_part(self[part_key])
+        return not (self._empty >> REPORT_PART_KEYS.index(part_key)) & 1
+
+
+class ReportSnapshot:
+    def __init__(self, path, header, file, mapped, body_start):
+        self.path = path
+        self.created_at = header["created_at"]
+        self.source_version = header.get("source_version")
+        self._file = file
+        self._mapped = mapped
+        self._body_start = body_start
+
+        columns = header["columns"]
+        body_length = max((offset + length for blobs in columns["blobs"] for offset, length in blobs), default=0)
+        if body_start + body_length > len(mapped):
+            raise ValueError("snapshot is truncated")
+        self.row_hashes = dict(zip(columns["company_name"], columns["row_hash"]))
+        empty_parts = columns.get("empty_parts") or [None] * len(columns["company_name"])
+        raw_lengths = columns.get("raw_length") or [None] * len(columns["company_name"])
+        self.reports = {
+            company_name: [make_company_report(company_name, LazyReportDetails(SnapshotPartSource(self, blobs, empty, raw_length)), score)]
+            for company_name, score, blobs, empty, raw_length in zip(
+                columns["company_name"], columns["investment_score"], columns["blobs"], empty_parts, raw_lengths
+            )
+        }
+
+    def read_blob(self, offset, length):
+        start = self._body_start + offset
+        return self._mapped[start:start + length]
+
+    @property
+    def age(self):
+        return time.time() - self.created_at
+
+
+def load_snapshot(path):
+    # Returns None when there is no usable snapshot; a bad file just means a normal cold start
+    path = Path(path)
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("not a report snapshot")
+        header_start = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size
+        (header_length,) = _HEADER_LENGTH.unpack(mapped[len(SNAPSHOT_MAGIC):header_start])
+        header = json.loads(mapped[header_start:header_start + header_length])
+        if header.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError("unsupported snapshot version")
+        return ReportSnapshot(path, header, file, mapped, header_start + header_length)
+    except (ValueError, KeyError, OSError, struct.error):
+        file.close()
+        return None
+
+
+def _atomic_write(path, write):
+    # Write next to the target then rename, so readers never see a half-written file
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _compressed_part(report_details, part_key):
+    # Parts already held compressed (from a previous snapshot, or in memory) are copied over as is
+    source = getattr(report_details, "raw_source", None)
+    if hasattr(source, "compressed"):
+        return source.compressed(part_key)
+    raw = report_details.raw(part_key) if isinstance(report_details, LazyReportDetails) else report_details.get(part_key, "")
+    if not isinstance(raw, str):
+        raw = json.dumps(raw, ensure_ascii=False)
+    return zlib.compress(raw.encode("utf-8"), 6)
+
+
+_write_lock = threading.Lock()
+
+
+def write_snapshot(path, reports, row_hashes, source_version=None):
+    columns = {"company_name": [], "investment_score": [], "row_hash": [], "blobs": [], "empty_parts": [], "raw_length": []}
+    bodies = []
+    offset = 0
+    for company_name, report_data_list in reports.items():
+        output = report_data_list[0]["output"]
+        blobs = []
+        for part_key in REPORT_PART_KEYS:
+            body = _compressed_part(output["report_details"], part_key)
+            blobs.append([offset, len(body)])
+            bodies.append(body)
+            offset += len(body)
+        columns["company_name"].append(company_name)
+        columns["investment_score"].append(output.get("Part 4: investment score", "N/A"))
+        columns["row_hash"].append(row_hashes.get(company_name))
+        columns["blobs"].append(blobs)
+        columns["empty_parts"].append(
+            empty_part_mask(not part_has_content(output["report_details"], part_key) for part_key in REPORT_PART_KEYS)
+        )
+        columns["raw_length"].append(raw_text_length(output["report_details"]))
+
+    header = json.dumps({
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": time.time(),
+        "source_version": source_version,
+        "columns": columns,
+    }, ensure_ascii=False, default=str).encode("utf-8")
+
+    def write(file):
+        file.write(SNAPSHOT_MAGIC)
+        file.write(_HEADER_LENGTH.pack(len(header)))
+        file.write(header)
+        for body in bodies:
+            file.write(body)
+
+    with _write_lock:
+        _atomic_write(path, write)
+
+
+# --- Stock name list: small enough for plain JSON ---
+def load_stock_names_snapshot(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return tuple(data["names"]), data["created_at"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def write_stock_names_snapshot(path, names):
+    payload = json.dumps({"created_at": time.time(), "names": list(names)}, ensure_ascii=False).encode("utf-8")
+    with _write_lock:
+        _atomic_write(path, lambda file: file.write(payload))
@@ -0,0 +1,380 @@
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import zlib
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+
+# --- Report sheet layout ---
+REPORT_PART_KEYS = [
+    "Part 1: Corporate Governance and Management Credibility Assessment",
+    "Part 2: Operational Risk and Business Quality Analysis",
+    "Part 3: Holistic Investment Investigation Report",
+]
+INVESTMENT_SCORE_KEY = "Part 4: investment score"
+STOCK_NAME_COLUMN = "Stocks_name"
+
+
+# --- Row -> report transform (shared by every backend) ---
+def _interned_object(pairs):
+    # Headings like "1. Future Forecast vs. Actuals (Past 5 Years)" repeat in every report;
+    # interning makes every parsed report share one copy of each
+    return {sys.intern(key): value for key, value in pairs}
+
+
+_part_decoder = json.JSONDecoder(object_pairs_hook=_interned_object)
+
+
+def parse_report_part(part_content):
+    try:
+        if isinstance(part_content, str) and part_content.strip().startswith(("{", "[")):
+            return _part_decoder.decode(part_content)
+        return part_content if part_content else {}
+    except json.JSONDecodeError:
+        # Keep the raw text so malformed JSON is still shown to the user
+        return part_content
+
+
+def is_blank_part(raw):
+    # Raw part text that parses to nothing worth showing
+    return raw.strip() in ("", "{}", "[]")
+
+
+def empty_part_mask(empty_flags):
+    # One bit per REPORT_PART_KEYS entry; small ints are shared, so it costs nothing per report
+    return sum(1 << i for i, empty in enumerate(empty_flags) if empty)
+
+
+def parse_investment_score(investment_score):
+    try:
+        return int(investment_score)
+    except (TypeError, ValueError):
+        return investment_score
+
+
+class CompressedPartSource(Mapping):
+    """Raw Part 1-3 text for one company, held zlib-compressed and inflated on access."""
+
+    __slots__ = ("_blobs", "_empty", "raw_length")
+
+    def __init__(self, raw_parts, level=1): # level 1: about half the CPU of 6 for ~5% larger blobs
+        texts = [str(raw_parts.get(part_key, "")) for part_key in REPORT_PART_KEYS]
+        self._blobs = tuple(zlib.compress(text.encode("utf-8", "surrogatepass"), level) for text in texts)
+        # Recorded while the text is at hand, so listing a report's sections never inflates it
+        self._empty = empty_part_mask(is_blank_part(text) for text in texts)
+        self.raw_length = sum(map(len, texts))
+
+    def __getitem__(self, part_key):
+        return zlib.decompress(self.compressed(part_key)).decode("utf-8", "surrogatepass")
+
+    def __iter__(self):
+        return iter(REPORT_PART_KEYS)
+
+    def __len__(self):
+        return len(REPORT_PART_KEYS)
+
+    def compressed(self, part_key):
+        try:
+            return self._blobs[REPORT_PART_KEYS.index(part_key)]
+        except ValueError:
+            raise KeyError(part_key) from None
+
+    def has_content(self, part_key):
+        return not (self._empty >> REPORT_PART_KEYS.index(part_key)) & 1
+
+
+def raw_text_length(report_details):
+    # Characters of sheet text behind a report; compressed sources recorded it when they were built
+    source = getattr(report_details, "raw_source", None)
+    if source is None:
+        return None
+    if hasattr(source, "compressed"):
+        return getattr(source, "raw_length", None)
+    return sum(len(raw) for raw in source.values() if isinstance(raw, str))
+
+
+class LazyReportDetails(Mapping):
+    """report_details that keep each part as raw sheet text until it is first read.
+
+    Parsing happens once per part and is memoised on the object, which lives in
+    the shared report cache, so a company's JSON is parsed at most once per sync.
+    Compressed sources (anything with a .compressed() method) are the exception:
+    their parts are re-parsed on each read so the parsed form never piles up, and
+    rendering is cached separately by content hash anyway.
+    """
+
+    __slots__ = ("_raw", "_parsed", "_hashes")
+
+    def __init__(self, raw_parts):
+        self._raw = raw_parts
+        self._parsed = None # created on first use; most reports are never opened
+        self._hashes = None
+
+    def __getitem__(self, part_key):
+        if self._parsed is not None and part_key in self._parsed:
+            return self._parsed[part_key]
+        value = parse_report_part(self._raw[part_key])
+        if not hasattr(self._raw, "compressed"):
+            if self._parsed is None:
+                self._parsed = {}
+            self._parsed[part_key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def raw(self, part_key):
+        return self._raw[part_key]
+
+    @property
+    def raw_source(self):
+        return self._raw
+
+    def is_parsed(self, part_key):
+        return self._parsed is not None and part_key in self._parsed
+
+    def has_content(self, part_key):
+        # Same truthiness as the parsed part, answered from the raw text where possible
+        has_content = getattr(self._raw, "has_content", None)
+        if has_content is not None:
+            return has_content(part_key) # compressed sources know without inflating the part
+        raw = self._raw.get(part_key, "")
+        if isinstance(raw, str):
+            return not is_blank_part(raw)
+        return bool(self.get(part_key))
+
+    def content_hash(self, part_key):
+        if self._hashes is not None and part_key in self._hashes:
+            return self._hashes[part_key]
+        compressed = getattr(self._raw, "compressed", None)
+        if compressed is not None:
+            # Hashing the compressed bytes is just as stable and skips inflating the part
+            data = bytes(compressed(part_key))
+        else:
+            data = str(self._raw.get(part_key, "")).encode("utf-8", "surrogatepass")
+        if self._hashes is None:
+            self._hashes = {}
+        digest = self._hashes[part_key] = hashlib.sha1(data).hexdigest()
+        return digest
+
+
+def part_has_content(report_details, part_key):
+    has_content = getattr(report_details, "has_content", None)
+    if has_content is not None:
+        return has_content(part_key) # answered from the raw text, without parsing
+    return bool(report_details.get(part_key, {}))
+
+
+# --- Compact report records ---
+# Read-only Mappings with the same keys as the {"output": {...}} dicts the app has always used,
+# so report["output"]["report_details"] and .get() keep working, at a fraction of a dict's size
+_OUTPUT_KEYS = ("company_name", "report_details", INVESTMENT_SCORE_KEY)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class ReportOutput(Mapping):
+    company_name: str
+    report_details: Mapping
+    investment_score: object
+
+    def __getitem__(self, key):
+        if key == "company_name":
+            return self.company_name
+        if key == "report_details":
+            return self.report_details
+        if key == INVESTMENT_SCORE_KEY:
+            return self.investment_score
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(_OUTPUT_KEYS)
+
+    def __len__(self):
+        return len(_OUTPUT_KEYS)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class CompanyReport(Mapping):
+    output: ReportOutput
+
+    def __getitem__(self, key):
+        if key == "output":
+            return self.output
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("output",))
+
+    def __len__(self):
+        return 1
+
+
+def make_company_report(company_name, report_details, investment_score):
+    return CompanyReport(ReportOutput(company_name, report_details, investment_score))
+
+
+def build_company_report(row, compress=False):
+    raw_parts = {part_key: row.get(part_key, "") for part_key in REPORT_PART_KEYS}
+    company_name = row.get("company_name")
+    return make_company_report(
+        sys.intern(company_name) if isinstance(company_name, str) else company_name,
+        LazyReportDetails(CompressedPartSource(raw_parts) if compress else raw_parts),
+        parse_investment_score(row.get(INVESTMENT_SCORE_KEY, "N/A")),
+    )
+
+
+def build_reports(rows, compress=False):
+    # Same {company_name: [report]} shape the app has always used
+    return {row["company_name"]: [build_company_report(row, compress)] for row in rows if row.get("company_name")}
+
+
+# --- Store interface ---
+class ReportStore:
+    """Where the result_stocks rows and the stocks name list come from.
+
+    Backends return raw sheet-shaped rows (dicts keyed by the sheet headers);
+    turning them into reports is done once, by build_company_report.
+    """
+
+    # True when fetch_rows_for is a real indexed lookup rather than a full scan
+    indexed = False
+
+    def fetch_rows(self):
+        raise NotImplementedError
+
+    def fetch_version(self):
+        # Something that changes whenever the rows do (e.g. a last-modified time), or None if unknown
+        return None
+
+    def fetch_rows_for(self, company_names):
+        wanted = set(company_names)
+        return [row for row in self.fetch_rows() if row.get("company_name") in wanted]
+
+    def fetch_stock_names(self):
+        raise NotImplementedError
+
+    def get_reports(self, company_names):
+        # One backend read for the whole batch; names with no row are left out
+        return build_reports(self.fetch_rows_for(company_names))
+
+
+class GoogleSheetsReportStore(ReportStore):
+    def __init__(self, sheets_client, sheet_name, results_tab, stocks_tab):
+        # sheets_client is a SheetsClient: shared auth, retries, rate limiting and circuit breaker
+        self.sheets_client = sheets_client
+        self.sheet_name = sheet_name
+        self.results_tab = results_tab
+        self.stocks_tab = stocks_tab
+
+    def _call(self, operation, max_retries=None):
+        return self.sheets_client.with_spreadsheet(self.sheet_name, operation, max_retries=max_retries)
+
+    def fetch_rows(self):
+        return self._call(lambda spreadsheet: spreadsheet.worksheet(self.results_tab).get_all_records())
+
+    def fetch_version(self):
+        # Drive's modifiedTime for the spreadsheet; lets a sync skip the download when nothing changed
+        # Optional probe (the sync falls back to a full compare), so no retries: a failure shouldn't pay the backoff twice
+        return self._call(lambda spreadsheet: spreadsheet.get_lastUpdateTime(), max_retries=0)
+
+    def fetch_stock_names(self):
+        def stock_names(spreadsheet):
+            worksheet = spreadsheet.worksheet(self.stocks_tab)
+            header = worksheet.row_values(1)
+            if STOCK_NAME_COLUMN not in header:
+                raise KeyError(f"'{STOCK_NAME_COLUMN}' column not found in '{self.stocks_tab}' tab.")
+            col_index = header.index(STOCK_NAME_COLUMN) + 1 # gspread is 1-indexed
+            return worksheet.col_values(col_index)[1:]
+        return [name.strip() for name in self._call(stock_names) if name.strip()]
+
+
+class SQLiteReportStore(ReportStore):
+    """Local copy of the sheet tabs, keyed by company name.
+
+    Rows are kept exactly as the sheet returns them (one JSON document per
+    row) so both backends go through the same transform. The file must
+    already exist unless create=True, so a mistyped path is an error rather
+    than a new, empty store.
+    """
+
+    indexed = True
+
+    def __init__(self, path, create=False):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        if create:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        else:
+            uri = f"{self.path.absolute().as_uri()}?mode=rw"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS result_stocks ("
+                " company_name TEXT PRIMARY KEY,"
+                " position INTEGER NOT NULL,"
+                " row_json TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stocks ("
+                " position INTEGER PRIMARY KEY,"
+                " name TEXT NOT NULL)"
+            )
+
+    def fetch_rows(self):
+        with self._lock:
+            cursor = self._conn.execute("SELECT row_json FROM result_stocks ORDER BY position")
+            return [json.loads(row_json) for (row_json,) in cursor]
+
+    def fetch_rows_for(self, company_names):
+        company_names = list(company_names)
+        rows = []
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(company_names), 500):
+            chunk = company_names[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            with self._lock:
+                cursor = self._conn.execute(
+                    f"SELECT row_json FROM result_stocks WHERE company_name IN ({placeholders})", chunk
+                )
+                rows.extend(json.loads(row_json) for (row_json,) in cursor)
+        return rows
+
+    def fetch_stock_names(self):
+        with self._lock:
+            cursor = self._conn.execute("SELECT name FROM stocks ORDER BY position")
+            return [name for (name,) in cursor]
+
+    def write_rows(self, rows):
+        # Replaces the whole tab, mirroring what the sheet would return
+        records = [
+            (row["company_name"], position, json.dumps(row))
+            for position, row in enumerate(rows) if row.get("company_name")
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM result_stocks")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO result_stocks (company_name, position, row_json) VALUES (?, ?, ?)",
+                records,
+            )
+
+    def write_stock_names(self, names):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM stocks")
+            self._conn.executemany(
+                "INSERT INTO stocks (position, name) VALUES (?, ?)", list(enumerate(names))
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def copy_store(source, target):
+    # e.g. copy_store(google_store, SQLiteReportStore("reports.db", create=True)) to take the sheet offline
+    target.write_rows(source.fetch_rows())
+    target.write_stock_names(source.fetch_stock_names())
@@ -0,0 +1,328 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from report_snapshot import (
+    load_snapshot,
+    load_stock_names_snapshot,
+    write_snapshot,
+    write_stock_names_snapshot,
+)
+from report_store import REPORT_PART_KEYS, build_company_report
+from tracing import span
+
+
+def row_hash(row):
+    # Stable fingerprint of a raw sheet row. Joining the cells directly (rather than json.dumps)
+    # keeps hashing several times cheaper than parsing the report JSON it lets us skip.
+    digest = hashlib.sha1()
+    for key in sorted(row):
+        digest.update(f"{key}\x1e{row[key]}\x1f".encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+@dataclass
+class SyncResult:
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    skipped: bool = False # True when the source version was unchanged and nothing was downloaded
+    row_count: int = 0
+    payload_bytes: int = 0 # Report text downloaded, before parsing
+
+    @property
+    def touched(self):
+        return self.added + self.changed + self.removed
+
+
+class _SnapshotSync:
+    """Shared refresh bookkeeping: a last good snapshot plus throttled, non-piling-up syncs.
+
+    With a snapshot_path, the data is restored from disk at startup and written
+    back (off the request thread) whenever a sync changes it.
+    """
+
+    def __init__(self, store, snapshot_path=None):
+        self.store = store
+        self.snapshot_path = snapshot_path
+        self.generation = 0 # Bumped every time a sync swaps in a new snapshot
+        self.fresh_at = None # time.time() when the data was last confirmed against the store
+        self.last_attempt = None
+        self.last_error = None
+        self._sync_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.fresh_at is not None
+
+    @property
+    def age(self):
+        # Seconds since the data was last confirmed fresh, or None before anything was loaded
+        return None if self.fresh_at is None else time.time() - self.fresh_at
+
+    def _sync_locked(self):
+        # Returns True when the data changed and the snapshot should be rewritten
+        raise NotImplementedError
+
+    def _restore(self, path):
+        # Returns the restored data's timestamp, or None when there was nothing to restore
+        raise NotImplementedError
+
+    def _persist(self, path):
+        raise NotImplementedError
+
+    def restore(self):
+        if self.snapshot_path is None or self.loaded:
+            return False
+        with self._sync_lock:
+            fresh_at = self._restore(self.snapshot_path)
+            if fresh_at is None:
+                return False
+            self.fresh_at = fresh_at
+            self.generation += 1
+            return True
+
+    def _persist_quietly(self):
+        try:
+            self._persist(self.snapshot_path)
+        except OSError:
+            pass # A missing snapshot only costs a slower cold start
+
+    def _run_sync(self):
+        self.last_attempt = time.monotonic()
+        try:
+            changed = self._sync_locked()
+        except Exception as e:
+            # The previous snapshot stays in place; callers decide how to report the failure
+            self.last_error = e
+            raise
+        self.last_error = None
+        self.fresh_at = time.time()
+        if changed and self.snapshot_path is not None:
+            threading.Thread(target=self._persist_quietly, daemon=True).start()
+        return changed
+
+    def sync(self):
+        with self._sync_lock:
+            return self._run_sync()
+
+    def _is_due(self, max_age):
+        return self.last_attempt is None or time.monotonic() - self.last_attempt >= max_age
+
+    def sync_if_stale(self, max_age, background=False):
+        if not self._is_due(max_age):
+            return
+        # Once something is loaded, nobody waits on a sync that's already running
+        if not self._sync_lock.acquire(blocking=not self.loaded):
+            return
+        if background and self.loaded:
+            # Serve what we have; the refresh runs on its own thread and swaps in when done
+            self.last_attempt = time.monotonic()
+            threading.Thread(target=self._background_sync, daemon=True).start()
+            return
+        try:
+            if self._is_due(max_age): # Another caller may have synced while we were waiting
+                self._run_sync()
+        finally:
+            self._sync_lock.release()
+
+    def _background_sync(self):
+        # Runs with _sync_lock already held by sync_if_stale
+        try:
+            self._run_sync()
+        except Exception:
+            pass # Recorded in last_error
+        finally:
+            self._sync_lock.release()
+
+
+class ReportSyncEngine(_SnapshotSync):
+    """Keeps {company_name: [report]} in step with a report store.
+
+    Each sync only re-parses rows whose content hash changed since the last
+    one; everything else is carried over from the previous snapshot. The
+    snapshot is replaced wholesale, never mutated, so readers can keep using
+    whatever `reports` they already hold. It is exposed read-only because it
+    is shared by every session in the process.
+    """
+
+    def __init__(self, store, snapshot_path=None, compress_bodies=False, history=None):
+        super().__init__(store, snapshot_path)
+        self.compress_bodies = compress_bodies # keep report text zlib-compressed in memory
+        self.history = history # optional ReportHistory that every new snapshot is appended to
+        self.reports = MappingProxyType({})
+        self.row_hashes = {}
+        self.source_version = None
+        self.last_result = None
+
+    def _fetch_version(self):
+        try:
+            return self.store.fetch_version()
+        except Exception:
+            # Version lookups are only an optimisation; fall back to a full compare
+            return None
+
+    def _sync_locked(self):
+        with span("report_sync") as sync_span:
+            changed = self._sync_rows()
+            result = self.last_result
+            sync_span.set(
+                skipped=result.skipped, rows=result.row_count, added=len(result.added),
+                changed=len(result.changed), removed=len(result.removed), payload_bytes=result.payload_bytes,
+            )
+        self._record_history()
+        return changed
+
+    def _record_history(self):
+        # Also runs after an unchanged first sync, so a restored snapshot is caught up with a new history file
+        if self.history is None or self.history.recorded_generation == self.generation:
+            return
+        args = (self.reports, self.row_hashes, self.generation) # read together before a concurrent swap
+        threading.Thread(target=self._record_history_quietly, args=args, daemon=True).start()
+
+    def _record_history_quietly(self, reports, row_hashes, generation):
+        try:
+            with span("report_history.record") as history_span:
+                history_span.set(versions=self.history.record(reports, row_hashes, generation))
+        except (OSError, sqlite3.Error):
+            pass # History is best effort; the next sync tries again
+
+    def _sync_rows(self):
+        version = self._fetch_version()
+        if version is not None and version == self.source_version and self.loaded:
+            self.last_result = SyncResult(skipped=True, row_count=len(self.reports))
+            return False
+
+        with span("report_sync.fetch_rows"):
+            rows = self.store.fetch_rows()
+        result = SyncResult()
+        reports = {}
+        row_hashes = {}
+        for row in rows:
+            company_name = row.get("company_name")
+            if not company_name:
+                continue
+            digest = row_hash(row)
+            result.payload_bytes += sum(len(part) for part in map(row.get, REPORT_PART_KEYS) if isinstance(part, str))
+            previous = self.row_hashes.get(company_name)
+            if previous == digest and company_name in self.reports:
+                reports[company_name] = self.reports[company_name]
+            else:
+                reports[company_name] = [build_company_report(row, self.compress_bodies)]
+                (result.added if previous is None else result.changed).append(company_name)
+            row_hashes[company_name] = digest
+        result.removed = [name for name in self.row_hashes if name not in row_hashes]
+        result.row_count = len(reports)
+        self.last_result = result
+
+        changed = bool(result.touched) or version != self.source_version
+        self.source_version = version
+        if not result.touched and self.generation:
+            return changed # Same rows as before; keep the existing snapshot object
+
+        # Swap in the new snapshot in one go
+        self.reports = MappingProxyType(reports)
+        self.row_hashes = row_hashes
+        self.generation += 1
+        return changed
+
+    def _restore(self, path):
+        snapshot = load_snapshot(path)
+        if snapshot is None:
+            return None
+        self.reports = MappingProxyType(snapshot.reports)
+        self.row_hashes = snapshot.row_hashes
+        self.source_version = snapshot.source_version
+        return snapshot.created_at
+
+    def _persist(self, path):
+        reports, row_hashes = self.reports, self.row_hashes # read both before a concurrent swap
+        write_snapshot(path, reports, row_hashes, self.source_version)
+
+
+class StockNameSync(_SnapshotSync):
+    """Last good copy of the stocks tab name list."""
+
+    def __init__(self, store, snapshot_path=None):
+        super().__init__(store, snapshot_path)
+        self.names = ()
+
+    def _sync_locked(self):
+        with span("stock_name_sync") as sync_span:
+            names = tuple(self.store.fetch_stock_names())
+            sync_span.set(rows=len(names))
+        if names == self.names:
+            return False
+        self.names = names
+        self.generation += 1
+        return True
+
+    def _restore(self, path):
+        restored = load_stock_names_snapshot(path)
+        if restored is None:
+            return None
+        self.names, created_at = restored
+        return created_at
+
+    def _persist(self, path):
+        write_stock_names_snapshot(path, self.names)
+
+
+class BackgroundRefresher:
+    """One daemon thread per process that keeps snapshot syncs warm.
+
+    Everything is synced once at startup, then each job is refreshed a little
+    before its interval runs out, so request threads only ever read the
+    current snapshot. Failed refreshes are retried sooner; the previous
+    snapshot keeps being served in the meantime.
+    """
+
+    def __init__(self, jobs, refresh_ahead=0.1, retry_delay=30.0):
+        # jobs: [(snapshot_sync, interval_seconds, on_change or None), ...]
+        self.jobs = jobs
+        self.refresh_ahead = refresh_ahead
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="report-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh(self, snapshot_sync, on_change):
+        generation = snapshot_sync.generation
+        try:
+            snapshot_sync.sync()
+        except Exception:
+            return # Recorded in last_error and surfaced by the next rerun
+        if on_change is not None and snapshot_sync.generation != generation:
+            try:
+                on_change()
+            except Exception:
+                pass # Derived caches are rebuilt lazily on the next rerun instead
+
+    def _next_due(self, snapshot_sync, interval):
+        if snapshot_sync.last_attempt is None:
+            return 0.0 # Never synced: due immediately
+        delay = self.retry_delay if snapshot_sync.last_error is not None else interval * (1 - self.refresh_ahead)
+        return snapshot_sync.last_attempt + min(delay, interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            due_times = []
+            for snapshot_sync, interval, on_change in self.jobs:
+                due = self._next_due(snapshot_sync, interval)
+                if due <= now:
+                    self._refresh(snapshot_sync, on_change)
+                    due = self._next_due(snapshot_sync, interval)
+                due_times.append(due)
+            self._stop.wait(max(1.0, min(due_times) - time.monotonic()))
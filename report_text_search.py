@@ -0,0 +1,214 @@
+import heapq
+import json
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+
+from report_store import REPORT_PART_KEYS
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_JSON_ESCAPE_RE = re.compile(r"\\(?:u[0-9a-fA-F]{4}|.)") # \n, \" and \uXXXX would otherwise leak in as tokens
+_JSON_PUNCTUATION_RE = re.compile(r'[{}\[\]"]+|\s+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(_JSON_ESCAPE_RE.sub(" ", text).lower())
+
+
+def _part_text(report_details, part_key):
+    # Index the raw sheet text when we have it, so building the index never parses JSON
+    raw = getattr(report_details, "raw", None)
+    if raw is not None:
+        try:
+            value = raw(part_key)
+        except KeyError:
+            return ""
+    else:
+        value = report_details.get(part_key, "")
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _readable(text):
+    # Good enough to show a snippet of a JSON part as prose
+    return _JSON_PUNCTUATION_RE.sub(" ", _JSON_ESCAPE_RE.sub(" ", text)).strip()
+
+
+@dataclass
+class TextSearchHit:
+    company_name: str
+    part_key: str
+    score: float
+    snippet: str
+
+
+class ReportTextIndex:
+    """Inverted index over the text of Parts 1-3 of every report, ranked with BM25.
+
+    Each (company, part) is one document. update() only re-tokenizes companies
+    whose report object changed since the last call; the sync engine keeps the
+    same object for unchanged rows, so a delta sync costs a delta's worth of work.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, snippet_chars=160):
+        self.k1 = k1
+        self.b = b
+        self.snippet_chars = snippet_chars
+        self.version = None
+        self._lock = threading.Lock()
+        self._postings = {} # term -> (array of doc ids, array of term counts)
+        self._docs = [] # doc id -> (company_name, part_key, report_details), None once removed
+        self._doc_lengths = array("I")
+        self._companies = {} # company_name -> (report_details, doc ids)
+        self._live_docs = 0
+        self._total_length = 0
+
+    def __len__(self):
+        return self._live_docs
+
+    def update(self, reports, version=None):
+        """Bring the index in line with a {company_name: [report]} mapping; returns (added, removed) doc counts."""
+        with self._lock:
+            if version is not None and version == self.version:
+                return 0, 0
+            added = removed = 0
+            seen = set()
+            for company_name, report_data_list in reports.items():
+                if not report_data_list:
+                    continue
+                seen.add(company_name)
+                report_details = report_data_list[0].get("output", {}).get("report_details", {})
+                indexed = self._companies.get(company_name)
+                if indexed is not None and indexed[0] is report_details:
+                    continue
+                if indexed is not None:
+                    removed += self._remove_company(company_name)
+                added += self._add_company(company_name, report_details)
+            for company_name in self._companies.keys() - seen:
+                removed += self._remove_company(company_name)
+            if len(self._docs) > 2 * max(self._live_docs, 1000):
+                self._compact()
+            self.version = version
+            return added, removed
+
+    def _add_company(self, company_name, report_details):
+        doc_ids = []
+        for part_key in REPORT_PART_KEYS:
+            counts = Counter(tokenize(_part_text(report_details, part_key)))
+            if not counts:
+                continue
+            doc_id = len(self._docs)
+            self._docs.append((company_name, part_key, report_details))
+            length = sum(counts.values())
+            self._doc_lengths.append(length)
+            self._total_length += length
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("I"), array("I"))
+                postings[0].append(doc_id)
+                postings[1].append(count)
+            doc_ids.append(doc_id)
+        self._companies[company_name] = (report_details, doc_ids)
+        self._live_docs += len(doc_ids)
+        return len(doc_ids)
+
+    def _remove_company(self, company_name):
+        # Postings keep the dead ids until the next compaction; search skips them
+        _, doc_ids = self._companies.pop(company_name)
+        for doc_id in doc_ids:
+            self._docs[doc_id] = None
+            self._total_length -= self._doc_lengths[doc_id]
+        self._live_docs -= len(doc_ids)
+        return len(doc_ids)
+
+    def _compact(self):
+        remap = {}
+        docs, doc_lengths = [], array("I")
+        for doc_id, doc in enumerate(self._docs):
+            if doc is not None:
+                remap[doc_id] = len(docs)
+                docs.append(doc)
+                doc_lengths.append(self._doc_lengths[doc_id])
+        postings = {}
+        for term, (doc_ids, counts) in self._postings.items():
+            kept = [(remap[doc_id], count) for doc_id, count in zip(doc_ids, counts) if doc_id in remap]
+            if kept:
+                postings[term] = (array("I", (doc_id for doc_id, _ in kept)), array("I", (count for _, count in kept)))
+        self._postings = postings
+        self._docs = docs
+        self._doc_lengths = doc_lengths
+        self._companies = {
+            company_name: (report_details, [remap[doc_id] for doc_id in doc_ids])
+            for company_name, (report_details, doc_ids) in self._companies.items()
+        }
+
+    def search(self, query, limit=20):
+        """Ranked documents containing every query term; an exact phrase match ranks higher."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings) or not self._live_docs:
+                return []
+            scores = self._bm25(postings)
+            # Only the best candidates are checked for the exact phrase
+            best = heapq.nlargest(limit * 3, scores.items(), key=lambda item: item[1])
+            candidates = [(self._docs[doc_id], score) for doc_id, score in best]
+        phrase = re.compile(r"\b" + r"\W+".join(map(re.escape, terms)) + r"\b", re.IGNORECASE) if len(terms) > 1 else None
+        any_term = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + r")", re.IGNORECASE)
+
+        ranked = []
+        for (company_name, part_key, report_details), score in candidates:
+            text = _part_text(report_details, part_key)
+            if phrase and phrase.search(text):
+                score *= 2
+            ranked.append((score, company_name, part_key, text))
+        ranked.sort(key=lambda item: (-item[0], item[1], item[2]))
+
+        hits = []
+        for score, company_name, part_key, text in ranked[:limit]:
+            text = _readable(text)
+            match = (phrase.search(text) if phrase else None) or any_term.search(text)
+            hits.append(TextSearchHit(company_name, part_key, score, self._snippet(text, match)))
+        return hits
+
+    def _bm25(self, postings):
+        # Start from the rarest term so the candidate set is as small as possible from the outset
+        postings = sorted(postings, key=lambda p: len(p[0]))
+        docs = self._docs
+        doc_lengths = self._doc_lengths
+        average_length = self._total_length / self._live_docs
+        k1, b = self.k1, self.b
+
+        scores = None
+        for doc_ids, counts in postings:
+            document_frequency = len(doc_ids) # counts removed docs until the next compaction; close enough to rank by
+            idf = math.log(1 + (self._live_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+            term_scores = {}
+            for doc_id, count in zip(doc_ids, counts):
+                if scores is not None and doc_id not in scores:
+                    continue
+                if docs[doc_id] is None:
+                    continue
+                norm = k1 * (1 - b + b * doc_lengths[doc_id] / average_length)
+                term_scores[doc_id] = idf * count * (k1 + 1) / (count + norm)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores:
+                break
+        return scores
+
+    def _snippet(self, text, match):
+        if match is None:
+            return text[: self.snippet_chars]
+        start = max(0, match.start() - self.snippet_chars // 2)
+        end = min(len(text), start + self.snippet_chars)
+        return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
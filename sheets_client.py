@@ -0,0 +1,232 @@
+import random
+import sys
+import threading
+import time
+
+# Responses worth retrying: quota (429) and transient server-side failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+UNAUTHORIZED_STATUS_CODE = 401
+
+
+class SheetsUnavailable(Exception):
+    """Sheets could not be reached: retries ran out or the circuit breaker is open."""
+
+
+def _status_code(exc):
+    # gspread's APIError keeps the requests response; fakes can just set .code
+    code = getattr(getattr(exc, "response", None), "status_code", None)
+    if code is None:
+        code = getattr(exc, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def _is_connection_error(exc):
+    # Dropped connections and timeouts only; a missing creds file is an OSError too, but retrying won't fix it
+    if isinstance(exc, (ConnectionError, TimeoutError)): # socket.timeout is TimeoutError
+        return True
+    requests = sys.modules.get("requests") # whatever gspread's transport raised, if it's loaded at all
+    return requests is not None and isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def _retry_after(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Client-side request budget, e.g. 60 requests per minute with bursts of 10."""
+
+    def __init__(self, rate_per_minute, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, max_wait):
+        # Wait for a token, but never longer than max_wait seconds
+        deadline = self.clock() + max_wait
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if self.clock() + wait > deadline:
+                return False
+            self.sleep(wait)
+
+
+class CircuitBreaker:
+    """Stops calling Sheets after repeated failures, then lets one trial call through.
+
+    Once reset_timeout has passed the breaker is half-open: the first caller
+    becomes the probe and everyone else keeps failing fast until the probe
+    either succeeds (closed) or fails (open again).
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None and self.clock() - self.opened_at < self.reset_timeout
+
+    def allow(self):
+        with self._lock:
+            if self.probe_in_flight:
+                return False
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at >= self.reset_timeout:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probe_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.probe_in_flight = False
+
+    def release_probe(self):
+        # The probe ended without telling us anything about Sheets (e.g. a config error); let the next caller try
+        with self._lock:
+            self.probe_in_flight = False
+
+
+class SheetsClient:
+    """One long-lived, authorized gspread client shared by the whole process.
+
+    `authorize` returns a fresh gspread client (or a fake of one). Every call
+    goes through the request budget, retries quota and server errors with
+    exponential backoff, re-authorizes on 401 or when the token is getting
+    old, and is short-circuited while the breaker is open so callers can fall
+    back to their last good data straight away.
+    """
+
+    def __init__(
+        self,
+        authorize,
+        max_retries=4,
+        base_delay=1.0,
+        max_delay=30.0,
+        requests_per_minute=60,
+        burst=10,
+        max_queue_wait=20.0,
+        failure_threshold=3,
+        reset_timeout=120.0,
+        reauthorize_after=45 * 60, # service account tokens last an hour
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.authorize = authorize
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_queue_wait = max_queue_wait
+        self.reauthorize_after = reauthorize_after
+        self.clock = clock
+        self.sleep = sleep
+        self.budget = TokenBucket(requests_per_minute, burst, clock=clock, sleep=sleep)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+        self._client = None
+        self._authorized_at = None
+        self._spreadsheets = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            expired = self._authorized_at is not None and self.clock() - self._authorized_at >= self.reauthorize_after
+            if self._client is None or expired:
+                self._client = self.authorize()
+                self._authorized_at = self.clock()
+                self._spreadsheets = {}
+            return self._client
+
+    def _reset_client(self):
+        with self._lock:
+            self._client = None
+            self._spreadsheets = {}
+
+    def _spreadsheet(self, sheet_name):
+        client = self._get_client()
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(sheet_name)
+        if spreadsheet is not None:
+            return spreadsheet
+        spreadsheet = client.open(sheet_name) # network call, so not under the lock
+        with self._lock:
+            if self._client is client: # don't cache a sheet opened by a client that has since been replaced
+                spreadsheet = self._spreadsheets.setdefault(sheet_name, spreadsheet)
+        return spreadsheet
+
+    def _backoff(self, attempt, exc):
+        delay = _retry_after(exc)
+        if delay is None:
+            # Full jitter keeps many sessions from retrying in lockstep
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        self.sleep(min(delay, self.max_delay))
+
+    def with_spreadsheet(self, sheet_name, operation, max_retries=None):
+        """Run operation(spreadsheet) under the budget, retry policy and circuit breaker.
+
+        max_retries overrides the client default, e.g. 0 for optional calls
+        whose failure the caller can shrug off.
+        """
+        if not self.breaker.allow():
+            raise SheetsUnavailable("Google Sheets is temporarily unavailable (circuit open).")
+
+        max_retries = self.max_retries if max_retries is None else max_retries
+        last_error = None
+        reauthorized = False
+        for attempt in range(max_retries + 1):
+            if not self.budget.acquire(self.max_queue_wait):
+                last_error = SheetsUnavailable("Client-side Sheets request budget exhausted.")
+                break
+            try:
+                result = operation(self._spreadsheet(sheet_name))
+            except Exception as e:
+                status_code = _status_code(e)
+                if status_code == UNAUTHORIZED_STATUS_CODE and not reauthorized:
+                    self._reset_client() # token was revoked or expired early
+                    reauthorized = True
+                    last_error = e
+                    continue
+                if status_code in RETRYABLE_STATUS_CODES or (status_code is None and _is_connection_error(e)):
+                    last_error = e
+                    if attempt < max_retries:
+                        self._backoff(attempt, e)
+                    continue
+                # Not transient (missing creds file, bad creds, missing sheet, permissions, ...): surface it as is
+                self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return result
+
+        self.breaker.record_failure()
+        raise SheetsUnavailable(f"Google Sheets request failed after retries: {last_error}") from last_error
@@ -0,0 +1,249 @@
+import bisect
+import heapq
+import re
+from collections import defaultdict
+
+_WORD_START = re.compile(r"(?:^|(?<=[\s\-&/.(]))\w", re.UNICODE)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Ranks, best first
+PREFIX_MATCH = 0 # query starts the name
+WORD_PREFIX_MATCH = 1 # query starts a later word of the name
+SUBSTRING_MATCH = 2 # query appears somewhere inside the name
+FUZZY_MATCH = 3 # every query word is within a few typos of a word of the name
+
+# Trigrams in more than this share of the vocabulary ("ind", " ch") say little about a typo;
+# they're skipped when collecting candidate words unless the query has nothing rarer
+COMMON_TRIGRAM_SHARE = 0.05
+
+
+def _trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _query_trigrams(text):
+    # No trailing pad: what the user typed so far is usually a prefix of a word, not a whole one
+    padded = f" {text}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def typo_budget(word):
+    # Edits tolerated in one query word: none for short words, where one edit is a different word
+    return 0 if len(word) < 4 else 1 if len(word) < 8 else 2
+
+
+def edit_distance(query, word, max_edits, prefix=False):
+    """Insertions, deletions, substitutions and adjacent swaps turning `query` into `word`.
+
+    With prefix=True the distance is to the closest prefix of `word`, since the
+    last word of a query is usually still being typed. Gives up with
+    max_edits + 1 as soon as the budget can't be met.
+    """
+    if prefix:
+        word = word[:len(query) + max_edits]
+    elif abs(len(word) - len(query)) > max_edits:
+        return max_edits + 1
+    previous_row = None
+    row = list(range(len(word) + 1))
+    for i, query_char in enumerate(query, 1):
+        before, previous_row, row = previous_row, row, [i] + [0] * len(word)
+        for j, word_char in enumerate(word, 1):
+            cost = query_char != word_char
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and query_char == word[j - 2] and query[i - 2] == word_char:
+                row[j] = min(row[j], before[j - 2] + 1)
+        if min(row) > max_edits:
+            return max_edits + 1
+    return min(min(row) if prefix else row[-1], max_edits + 1)
+
+
+class StockNameIndex:
+    """Search index over the stocks tab, built once when the name list loads.
+
+    Prefix lookups use a sorted key list and bisect. Substring lookups run
+    str.find over every name joined in alphabetical order, so the first hits
+    are the best ones and the scan stops once the list is full. Typos are
+    matched word by word against the distinct words of all names, so a
+    misspelt first word ("relaince") is compared with "reliance" rather
+    than with the whole name, and the names using those words are narrowed
+    with set intersections instead of a scan.
+    """
+
+    def __init__(self, names):
+        self.names = list(dict.fromkeys(names)) # de-duplicated, original order
+        self._folded = [name.casefold() for name in self.names]
+        self._ids = {name: name_id for name_id, name in enumerate(self.names)}
+
+        # Whole names, and every later word start, each kept sorted for bisect
+        self._name_keys = sorted((folded, name_id) for name_id, folded in enumerate(self._folded))
+        self._word_keys = sorted(
+            (folded[match.start():], name_id)
+            for name_id, folded in enumerate(self._folded)
+            for match in _WORD_START.finditer(folded) if match.start() > 0
+        )
+
+        # Every name in alphabetical order on its own line, and where each line starts
+        self._text = "\n".join(folded.replace("\n", " ") for folded, _ in self._name_keys)
+        self._line_starts = []
+        # A query with a trigram no name has can't be a substring of any, so the scan is skipped
+        self._text_trigrams = {self._text[i:i + 3] for i in range(len(self._text) - 2)}
+        self._alphabetical = [0] * len(self.names) # name_id -> line in _text
+        # Distinct words of all names: which names use each one, and word trigram postings for typos
+        self._vocabulary = []
+        self._word_ids = {}
+        self._name_words = [()] * len(self.names)
+        word_names = []
+        line_start = 0
+        for position, (folded, name_id) in enumerate(self._name_keys):
+            self._line_starts.append(line_start)
+            line_start += len(folded) + 1
+            self._alphabetical[name_id] = position
+            word_ids = []
+            for word in dict.fromkeys(_WORD.findall(folded)):
+                word_id = self._word_ids.setdefault(word, len(self._vocabulary))
+                if word_id == len(self._vocabulary):
+                    self._vocabulary.append(word)
+                    word_names.append([])
+                word_names[word_id].append(name_id)
+                word_ids.append(word_id)
+            self._name_words[name_id] = tuple(word_ids)
+        self._word_names = [tuple(name_ids) for name_ids in word_names]
+        self._word_name_sets = {} # word_id -> frozenset of its names, built on first use
+        self._sorted_words = sorted((word, word_id) for word_id, word in enumerate(self._vocabulary))
+        self._word_postings = defaultdict(list)
+        for word_id, word in enumerate(self._vocabulary):
+            for gram in _trigrams(word):
+                self._word_postings[gram].append(word_id)
+        self._common_trigram_limit = max(20, int(len(self._vocabulary) * COMMON_TRIGRAM_SHARE))
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _prefix_range(keys, query, wanted, skip_ids):
+        # Keys are sorted, so the first `wanted` hits are also the alphabetically best ones
+        position = bisect.bisect_left(keys, (query,))
+        while wanted > 0 and position < len(keys) and keys[position][0].startswith(query):
+            name_id = keys[position][1]
+            if name_id not in skip_ids:
+                skip_ids.add(name_id) # a name can have several matching word starts
+                yield name_id
+                wanted -= 1
+            position += 1
+
+    def _substrings(self, query, wanted, skip_ids):
+        # One C-level find per hit; a query can't hold a newline, so a hit never spans two names
+        if any(query[i:i + 3] not in self._text_trigrams for i in range(len(query) - 2)):
+            return
+        found_at = self._text.find(query)
+        while found_at != -1:
+            line = bisect.bisect_right(self._line_starts, found_at) - 1
+            name_id = self._name_keys[line][1]
+            if name_id not in skip_ids:
+                yield name_id
+                wanted -= 1
+                if not wanted:
+                    return
+            if line + 1 == len(self._line_starts):
+                return
+            found_at = self._text.find(query, self._line_starts[line + 1])
+
+    def _similar_words(self, word, prefix):
+        """{word_id: edits} for vocabulary words within the typo budget of one query word."""
+        found = {}
+        if prefix:
+            position = bisect.bisect_left(self._sorted_words, (word,))
+            while position < len(self._sorted_words) and self._sorted_words[position][0].startswith(word):
+                found[self._sorted_words[position][1]] = 0
+                position += 1
+        elif word in self._word_ids:
+            found[self._word_ids[word]] = 0
+        max_edits = typo_budget(word)
+        if not max_edits:
+            return found
+
+        grams = _query_trigrams(word) if prefix else _trigrams(word)
+        postings = sorted((self._word_postings.get(gram, ()) for gram in grams), key=len)
+        rare = [posting for posting in postings if len(posting) <= self._common_trigram_limit] or postings[:1]
+        shared = defaultdict(int)
+        for posting in rare:
+            for word_id in posting:
+                shared[word_id] += 1
+        # An edit changes at most four trigrams (a swap touches two characters), so a word
+        # within budget shares at least this many of the query word's trigrams
+        needed = max(1, len(grams) - 4 * max_edits - (len(postings) - len(rare)))
+        for word_id, count in shared.items():
+            candidate = self._vocabulary[word_id]
+            # Typos are taken to be past the first letter, which keeps the edit distances to a few
+            if count < needed or word_id in found or candidate[0] != word[0]:
+                continue
+            edits = edit_distance(word, candidate, max_edits, prefix)
+            if edits <= max_edits:
+                found[word_id] = edits
+        return found
+
+    def _names_using(self, word_id):
+        name_set = self._word_name_sets.get(word_id)
+        if name_set is None:
+            name_set = self._word_name_sets[word_id] = frozenset(self._word_names[word_id])
+        return name_set
+
+    def _fuzzy(self, query, wanted, skip_ids):
+        # Each query word must match a word of the name, the last one as a prefix. Candidates are
+        # the names of the rarest query word, narrowed by set intersections with the others
+        words = _WORD.findall(query)
+        if not words:
+            return []
+        matches = [self._similar_words(word, prefix=i == len(words) - 1) for i, word in enumerate(words)]
+        if not all(matches):
+            return []
+        matches.sort(key=lambda found: sum(len(self._word_names[word_id]) for word_id in found))
+        candidates = frozenset().union(*map(self._names_using, matches[0]))
+        for found in matches[1:]:
+            candidates = frozenset().union(*(candidates & self._names_using(word_id) for word_id in found))
+        candidates -= skip_ids
+
+        # A query word whose matches all need the same edits adds the same to every name
+        constant, varying = 0, []
+        for found in matches:
+            levels = set(found.values())
+            if len(levels) == 1:
+                constant += levels.pop()
+            else:
+                varying.append(found)
+        if not varying:
+            chosen = heapq.nsmallest(wanted, candidates, key=self._alphabetical.__getitem__)
+            return [(name_id, (constant, self._folded[name_id])) for name_id in chosen]
+        ranked = heapq.nsmallest(wanted, (
+            (constant + sum(min(found[word_id] for word_id in self._name_words[name_id] if word_id in found) for found in varying),
+             self._alphabetical[name_id], name_id)
+            for name_id in candidates
+        ))
+        return [(name_id, (edits, self._folded[name_id])) for edits, _, name_id in ranked]
+
+    def search(self, query, limit=10, exclude=()):
+        folded_query = query.strip().casefold()
+        if not folded_query:
+            return []
+
+        exclude_ids = {self._ids[name] for name in exclude if name in self._ids}
+        best = {} # name_id -> (rank, tie-break)
+        def offer(name_id, rank, tie_break):
+            current = best.get(name_id)
+            if current is None or (rank, tie_break) < current:
+                best[name_id] = (rank, tie_break)
+
+        for name_id in self._prefix_range(self._name_keys, folded_query, limit, set(exclude_ids)):
+            offer(name_id, PREFIX_MATCH, self._folded[name_id])
+        for name_id in self._prefix_range(self._word_keys, folded_query, limit - len(best), exclude_ids | best.keys()):
+            offer(name_id, WORD_PREFIX_MATCH, self._folded[name_id])
+        if len(best) < limit:
+            for name_id in self._substrings(folded_query, limit - len(best), exclude_ids | best.keys()):
+                offer(name_id, SUBSTRING_MATCH, self._folded[name_id])
+        if len(folded_query) >= 3 and len(best) < limit:
+            for name_id, tie_break in self._fuzzy(folded_query, limit - len(best), exclude_ids | best.keys()):
+                offer(name_id, FUZZY_MATCH, tie_break)
+
+        ranked = sorted(best.items(), key=lambda item: item[1])
+        return [self.names[name_id] for name_id, _ in ranked[:limit]]
@@ -1,14 +1,52 @@
 import streamlit as st
 import pandas as pd
 import json
-import time
-from PIL import Image
 from pathlib import Path
+from types import MappingProxyType
+from collections import ChainMap
 import base64
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import os # Import os for environment variables (though we're reverting its use for creds)
+from datetime import datetime
+from functools import partial
+import importlib
+import math
+import os # Import os for environment variables (used to pick the report store backend, not for creds)
+import sqlite3
+import sys
 import warnings # Import warnings to suppress the rsa UserWarning
+from report_store import (
+    STOCK_NAME_COLUMN,
+    GoogleSheetsReportStore,
+    SQLiteReportStore,
+    part_has_content,
+    raw_text_length,
+)
+from report_sync import BackgroundRefresher, ReportSyncEngine, StockNameSync
+from sheets_client import SheetsClient, SheetsUnavailable
+from company_names import CompanyNameResolver, load_aliases
+from company_browser import CompanyBrowseIndex
+from stock_search import StockNameIndex
+import tracing
+from report_analytics import (
+    COMPANY_COLUMN,
+    FLAGS_COLUMN,
+    PERCENTILE_COLUMN,
+    SCORE_COLUMN,
+    build_score_table,
+    factor_names,
+    filter_score_table,
+    percentile_of,
+)
+from report_export import EXPORT_FORMATS, export_reports
+from report_text_search import ReportTextIndex
+from report_history import REMOVED, ReportHistory
+from report_sections import (
+    DATAFRAME,
+    MARKDOWN,
+    SECTION_TITLES,
+    TABLE,
+    build_section_blocks,
+    part_content_hash,
+)
 
 # Suppress the specific rsa UserWarning globally if you're sure it's not a critical issue for your use case
 warnings.filterwarnings("ignore", category=UserWarning, module="rsa.key")
@@ -16,6 +54,12 @@ warnings.filterwarnings("ignore", category=UserWarning, module="rsa.key")
 # --- Page Configuration ---
 st.set_page_config(page_title="Utopiaequity", page_icon="assets/logo.png", layout="wide")
 
+# --- Per-rerun timing: every span recorded below belongs to this rerun of this session ---
+if "trace_session_id" not in st.session_state:
+    st.session_state.trace_session_id = tracing.new_session_id()
+rerun_trace = tracing.begin_rerun(st.session_state.trace_session_id, st.session_state.get("rerun_trace"))
+st.session_state.rerun_trace = rerun_trace
+
 # --- Function to encode image to base64 for embedding in CSS ---
 def get_image_as_base64(path):
     try:
@@ -23,8 +67,7 @@ def get_image_as_base64(path):
             data = f.read()
         return base64.b64encode(data).decode()
     except FileNotFoundError:
-        st.error(f"Logo file not found at: {path}. Please ensure 'assets/logo.png' exists.")
-        return ""
+        return None
 
 # --- Google Sheet Configuration ---
 GOOGLE_SHEET_SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
@@ -32,233 +75,532 @@ GOOGLE_SHEET_NAME = "ai_agents"
 GOOGLE_SHEET_TAB_NAME_RESULTS = "result_stocks" # Original tab for results
 GOOGLE_SHEET_TAB_NAME_STOCKS = "stocks"       # New tab for stock names from where autocomplete suggestions are fetched
 GCP_CREDS_FILE = Path("assets/creds.json") # Path to your service account JSON file (fallback)
+SAMPLE_REPORTS_PATH = Path("assets/sample_reports.json") # Sample companies shown alongside the sheet
+LOGO_PATH = Path("assets/logo.png")
+
+# --- Report store configuration ---
+# "google_sheets" reads the tabs above live; "sqlite" serves them from a local file (offline / tests)
+REPORT_STORE_BACKEND = os.environ.get("REPORT_STORE_BACKEND", "google_sheets")
+REPORT_STORE_SQLITE_PATH = Path(os.environ.get("REPORT_STORE_SQLITE_PATH", "assets/reports.db"))
+REPORT_SYNC_INTERVAL = 600 # Seconds between delta syncs of the result_stocks tab
+STOCK_NAMES_SYNC_INTERVAL = 3600 # Seconds between refreshes of the stocks tab
+GSPREAD_CLIENT_FACTORY = os.environ.get("GSPREAD_CLIENT_FACTORY") # Swap in a fake gspread client (benchmarks)
+BACKGROUND_REFRESH = os.environ.get("BACKGROUND_REFRESH", "1") != "0" # Set to 0 to sync on request threads only
+# Local snapshots of both tabs so a restarted instance can serve without waiting on Sheets
+REPORT_SNAPSHOT_PATH = Path(os.environ.get("REPORT_SNAPSHOT_PATH", ".cache/reports.snapshot"))
+STOCK_NAMES_SNAPSHOT_PATH = Path(os.environ.get("STOCK_NAMES_SNAPSHOT_PATH", ".cache/stock_names.json"))
+REPORT_BODY_COMPRESSION = os.environ.get("REPORT_BODY_COMPRESSION", "1") != "0" # Hold report text zlib-compressed in memory
+REPORT_HISTORY = os.environ.get("REPORT_HISTORY", "1") != "0" # Set to 0 to stop recording report versions
+REPORT_HISTORY_PATH = Path(os.environ.get("REPORT_HISTORY_PATH", ".cache/report_history.db"))
+RECENTLY_UPDATED_LIMIT = 20 # Companies listed under "Recently updated" in the Browse tab
+BROWSE_PAGE_SIZES = (25, 50, 100) # Rows per page in the Browse tab's company table
+AUTOCOMPLETE_SUGGESTION_LIMIT = 10 # Top-K suggestions shown under the stock name input
+BATCH_FETCH_CHUNK_SIZE = 8 # Stocks per backend read when generating reports for a list
+COMPANY_ALIASES_PATH = Path(os.environ.get("COMPANY_ALIASES_PATH", "assets/company_aliases.json")) # {"TICKER": "Company Name"} map, NSE symbols
+TEXT_SEARCH_RESULT_LIMIT = 20 # Ranked sections shown for a report-content search
+
+# --- Instrumentation ---
+TRACE_FILE = os.environ.get("TRACE_FILE") # Append timing spans here as JSON Lines (off when unset)
+DEBUG_PANEL = os.environ.get("DEBUG_PANEL") == "1" # Or open the app with ?debug=1
+
+
+# --- Fixed sample companies, loaded once per process and shared read-only by every session ---
+@st.cache_resource(show_spinner=False)
+def get_sample_reports():
+    # Also read from the background refresher thread, so a missing file just means no samples
+    try:
+        with open(SAMPLE_REPORTS_PATH, encoding="utf-8") as f:
+            return MappingProxyType(json.load(f))
+    except (OSError, ValueError):
+        return MappingProxyType({})
 
-
-# --- Initialize MOCK_DATABASE with fixed companies, and use session state for dynamic data ---
-if "MOCK_DATABASE" not in st.session_state:
-    st.session_state.MOCK_DATABASE = {
-        "Natco Pharma Ltd": [
-            {"output": {"company_name": "Natco Pharma Ltd", "report_details": {"Part 1: Corporate Governance and Management Credibility Assessment": {"1. Future Forecast vs. Actuals (Past 5 Years)": "Based on available information, assessing Natco Pharma's forecasts against actual performance over the past five years reveals a mixed track record. While specific conference call transcripts and detailed financial data would be needed for a precise analysis, general trends suggest that the company has faced challenges in consistently meeting its ambitious growth targets. Factors such as regulatory hurdles in key markets (like the US), pricing pressures in the generic drug market, and delays in product approvals have impacted their performance. The management's communication has generally been transparent regarding these challenges, but the predictability of their forecasts could be improved.", "2. Management Guidance Analysis": {"Current Guidance": "Natco Pharma's current guidance typically includes projections for revenue growth, EBITDA margins, and specific CapEx plans related to new facilities or product development. While exact figures vary year to year, recent guidance has emphasized expansion in key markets (US, India, and emerging markets), investment in complex generics and specialty products, and maintaining a healthy balance sheet. More granular figures require up-to-date earnings calls and investor presentations.", "Historical Comparison": {"Revenue": "In previous years (e.g., 3-5 years ago), Natco Pharma's revenue guidance often targeted double-digit percentage growth, driven by new product launches and market penetration. In some years, they met or exceeded these targets, particularly when they successfully launched key products. However, there.were instances where revenue growth fell short due to unexpected regulatory delays, increased competition, or market-specific challenges. Specific figures will require a review of past annual reports and investor presentations.", "Bottom Line": "Similar to revenue, Natco Pharma aimed for significant bottom-line growth (EBITDA/PAT) in past guidance. Success in achieving these targets depended heavily on their ability to control costs, manage pricing pressures, and efficiently scale up production. There were instances where they exceeded expectations due to favorable product mixes or cost optimization initiatives, but also instances where they fell short due to increased operating expenses or pricing pressures. Specific figures will will require a review of past annual reports and investor presentations.", "CapEx/Strategic Initiatives": "Natco Pharma has consistently announced CapEx plans focused on expanding manufacturing capacity, upgrading R&D facilities, and investing in new technologies. The execution of these plans has generally been consistent with their stated intentions, although there have been occasional delays due to unforeseen circumstances or regulatory approvals. For instance, announcements regarding capacity expansion for specific product lines or investments in biosimilar development have largely materialized as planned."}, "Overall Credibility Assessment": "Overall, Natco Pharma's management has demonstrated reasonable credibility in forecasting, although their projections can be susceptible to external factors such as regulatory changes and market dynamics. They tend to provide relatively transparent guidance, acknowledging both potential opportunities and challenges. However, investors should exercise caution and consider the inherent uncertainties in the pharmaceutical industry when evaluating their forecasts."}}, "Part 2: Operational Risk and Business Quality Analysis": {"summary_table": [{"Factor": "High Capex", "Assessment": "NO", "Data": "Most recent annual Capex is around 150-200 Cr INR", "Justification": "Capex is relatively low as a percentage of revenue compared to other Pharma companies, indicating a lower capital intensity."}, {"Factor": "High R&D", "Assessment": "YES", "Data": "Most recent annual R&D expense is around 10-12% of revenues.", "Justification": "R&D expense is significant, reflecting the need for continuous innovation in the pharmaceutical industry. Relatively higher than industry average indicates higher risk and reward."}, {"Factor": "Risky Capex", "Assessment": "NO", "Data": "N/A", "Justification": "Capex is primarily directed towards expanding existing facilities and upgrading equipment, with a focus on known product lines. Although there is risk, the company isn't known for taking extreme capital expenditure risk."}, {"Factor": "Risky R&D", "Assessment": "YES", "Data": "N/A", "Justification": "R&D efforts are focused on complex generics and specialty products, which carry higher risks of failure but also offer potentially higher rewards if successful."}, {"Factor": "Dual Class Shares", "Assessment": "NO", "Data": "N/A", "Justification": "Natco Pharma does not have a dual-class share structure."}, {"Factor": "Wasteful FCF", "Assessment": "NO", "Data": "FCF positive", "Justification": "FCF is typically reinvested into R&D, capacity expansion, and debt reduction, indicating efficient capital allocation. Dividends are also paid."}, {"Factor": "Bad Industry", "Assessment": "NO", "Data": "N/A", "Justification": "The pharmaceutical industry offers growth opportunities, particularly in generics and specialty products, but faces regulatory and pricing pressures. Overall good prospects."}, {"Factor": "Acquisition Growth", "Assessment": "NO", "Data": "N/A", "Justification": "Natco Pharma's growth strategy primarily relies on organic growth through product development and market expansion, rather than aggressive acquisitions. This lowers risk."}, {"Factor": "High Debt", "Assessment": "NO", "Data": "Debt to equity ratio below 0.5", "Justification": "Debt levels are manageable, with a healthy debt-to-equity ratio compared to industry peers."}, {"Factor": "Intense Competition", "Assessment": "YES", "Data": "Generic drug market is competitive", "Justification": "The generic pharmaceutical market is highly competitive, with numerous players vying for market share. Pricing pressures are always present."}, {"Factor": "High SBC (Stock-Based Compensation)", "Assessment": "NO", "Data": "SBC is less than 3% of revenue.", "Justification": "Stock-based compensation is relatively low compared to revenue and industry standards."}], "Overall Risk Assessment": "Natco Pharma presents a moderate risk profile. Key risks include R&D success and competition, while financial health is maintained with moderate debt and good FCF management. Company’s moderate capital expenditure is used efficiently. Although R&D is risky, is necessary to grow business. The industry presents opportunities, but also competitive pressure."}, "Part 3: Holistic Investment Investigation Report": {"1. Overall Investigation (Li Lu Style)": "Natco Pharma is a vertically integrated pharmaceutical company focusing on niche therapeutic areas and complex generics. They have demonstrated a strong track record of innovation and successful product launches, particularly in oncology and specialty products. The company's key strengths include its R&D capabilities, manufacturing efficiency, and strong relationships with key stakeholders. Challenges include regulatory hurdles, pricing pressures, and competition in the generic drug market. Recent FDA inspections have increased concern about quality control.", "2. Business Model and Moat (Nick Sleep Style)": "Natco Pharma's business model centers around developing, manufacturing, and marketing niche pharmaceutical products, including generics and specialty drugs. Its competitive advantages (moats) include its strong R&D capabilities, which enable it to develop complex generics and differentiated products. Furthermore, its manufacturing efficiency and vertically integrated operations allow it to maintain cost competitiveness. These moats are reasonably sustainable, providing a buffer against competition, particularly in niche therapeutic areas. However, pricing pressures in the generic drug market can erode profitability.", "3. Risks and Quality of Business (Charlie Munger Style)": "Key risks associated with Natco Pharma's business include regulatory risks (e.g., FDA approvals, inspections), pricing pressures, competition, and product liability risks. The overall quality of the business is considered good, given its strong R&D capabilities, efficient operations, and experienced management team. However, investors should be aware of the inherent uncertainties in the pharmaceutical industry and potential for adverse events. Management integrity is good with a long track record.", "4. Owner's Earnings and Margin of Safety (Warren Buffett Style)": {"Owner's Earnings and Margin of Safety Analysis": "Estimating Natco Pharma's \"owner's earnings\" requires adjusting net income for non-cash expenses (e.g., depreciation, amortization) and CapEx. Intrinsic value can then be determined using a discounted cash flow (DCF) analysis, considering future growth rates and discount rates. The margin of safety depends on the difference between the intrinsic value and the current market price. Due to the uncertainties inherent to forecasting the company's earnings accurately, a conservative estimate is needed.", "IRR Projections": {"Li Lu": "Bear: 5%, Base: 10%, Bull: 15%", "Nick Sleep": "Bear: 7%, Base: 12%, Bull: 18%", "Charlie Munger": "Bear: 3%, Base: 8%, Bull: 13%", "Warren Buffett": "Bear: 4%, Base: 9%, Bull: 14%"}, "Fat Pitch Analysis": "A \"fat pitch\" investment opportunity for Natco Pharma would occur if the company's stock price significantly declined due to temporary setbacks (e.g., regulatory delays, market corrections) while its long-term fundamentals remained strong. This would create an opportunity to buy a high-quality business at a discounted valuation, providing a substantial margin of safety."}, "5. 3-10 Year Hold Scenarios": "Bear Case (20% probability): Regulatory setbacks, increased competition, and pricing pressures lead to declining revenue and profit margins. Average revenue declines 5% annually. Base Case (60% probability): Natco Pharma maintains its market position, introduces new products, and achieves moderate growth. Average revenue grows 8% annually. Bull Case (20% probability): Successful product launches, expansion into new markets, and favorable regulatory environment drive significant growth. Average revenue grows 15% annually. All scenarios assume continued investment in R&D."}}, "Part 4: investment score": 69}}
-        ],
-        "IZMO Ltd": [
-            {"output": {"company_name": "IZMO Ltd", "report_details": {"Part 1: Corporate Governance and Management Credibility Assessment": {"1. Future Forecast vs. Actuals (Past 5 Years)": "Analysis of past forecasts vs. actuals for IZMO Ltd requires detailed financial data, including revenue projections and actual results. Without this data, a thorough assessment cannot be provided.", "2. Management Guidance Analysis": {"Current Guidance": "Detailed management's current guidance for IZMO Ltd is needed, including revenue growth, CapEx plans, and strategic initiatives. Specific figures and timelines are required for an accurate analysis.", "Historical Comparison": {"Revenue": "Comparison of past revenue guidance with actuals for IZMO Ltd requires historical data on management's projections and reported revenue. This information is necessary to assess accuracy.", "Bottom Line": "Comparison of past bottom-line guidance with actuals for IZMO Ltd requires historical data on management's profit projections and reported earnings. Without this data, an evaluation is impossible.", "CapEx/Strategic Initiatives": "Comparison of past CapEx/strategic initiative announcements with actual execution for IZMO Ltd requires tracking management's plans and comparing them to actual investments and results. This data is currently unavailable."}, "Overall Credibility Assessment": "Assessment of management's credibility in forecasting for IZMO Ltd requires a track record of guidance versus actual results. Without sufficient historical data, an objective assessment is not feasible."}}, "Part 2: Operational Risk and Business Quality Analysis": {"summary_table": [{"Factor": "High Capex", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to determine if IZMO Ltd's capital expenditure is high relative to its peers or historical performance without financial data."}, {"Factor": "High R&D", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to determine if IZMO Ltd's research and development spending is high relative to its peers or historical performance without financial data."}, {"Factor": "Risky Capex", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Cannot determine whether IZMO Ltd has undertaken risky capital expenditure projects without detailed financial information."}, {"Factor": "Risky R&D", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Cannot determine whether IZMO Ltd has undertaken risky R&D projects without detailed financial information."}, {"Factor": "Dual Class Shares", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to assess the share structure of IZMO Ltd without detailed information on its corporate governance."}, {"Factor": "Wasteful FCF", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to determine if IZMO Ltd is wasting free cash flow without detailed financial analysis."}, {"Factor": "Bad Industry", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to determine the long-term prospects of IZMO Ltd's industry without detailed industry analysis."}, {"Factor": "Acquisition Growth", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to assess whether IZMO Ltd relies on acquisitions for growth without analyzing its acquisition history."}, {"Factor": "High Debt", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to determine if IZMO Ltd has a high debt level without a review of its financial statements."}, {"Factor": "Intense Competition", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to assess the competitive landscape for IZMO Ltd without market analysis."}, {"Factor": "High SBC (Stock-Based Compensation)", "Assessment": "N/A", "Data": "Insufficient data", "Justification": "Unable to determine if IZMO Ltd's SBC is high without analyzing its financial statements."}], "Overall Risk Assessment": "Based on the lack of available data, a comprehensive risk assessment for IZMO Ltd cannot be performed."}, "Part 3: Holistic Investment Investigation Report": {"1. Overall Investigation (Li Lu Style)": "A comprehensive investigation into IZMO Ltd's strengths, weaknesses, and key business drivers requires detailed financial and operational data. Without sufficient information, an accurate analysis is not possible.", "2. Business Model and Moat (Nick Sleep Style)": "Analyzing IZMO Ltd's business model, competitive advantages and their sustainability requires in-depth knowledge of the company's operations and industry dynamics. More data is needed for this assessment.", "3. Risks and Quality of Business (Charlie Munger Style)": "Assessing the risks and quality of IZMO Ltd's business requires evaluating its financial stability, competitive positioning, and management's capital allocation decisions. This analysis requires access to additional data.", "4. Owner's Earnings and Margin of Safety (Warren Buffett Style)": {"Owner's Earnings and Margin of Safety Analysis": "Calculating IZMO Ltd's owner's earnings and determining a margin of safety requires detailed financial projections and a valuation analysis, which cannot be completed without sufficient data.", "IRR Projections": {"Li Lu": "Unable to project IRR for IZMO Ltd without sufficient data.", "Nick Sleep": "Unable to project IRR for IZMO Ltd without sufficient data.", "Charlie Munger": "Unable to project IRR for IZMO Ltd without sufficient data.", "Warren Buffett": "Unable to project IRR for IZMO Ltd without sufficient data."}, "Fat Pitch Analysis": "Identifying conditions for a 'fat pitch' investment in IZMO Ltd requires a thorough understanding of its intrinsic value and potential future growth. Further data is needed for this analysis."}, "5. 3-10 Year Hold Scenarios": "Developing bear, base, and bull case scenarios for holding IZMO Ltd for 3-10 years requires financial modeling and projections based on assumptions about its future performance. These projections cannot be made without additional information."}}, "Part 4: investment score": 25}}
-        ]
-    }
+# Per-session overlay: only reports this session fetched that aren't in the shared snapshot yet
+if "report_overlay" not in st.session_state:
+    st.session_state.report_overlay = {}
 
 # --- Helper function to get GCP credentials from the JSON file ---
-@st.cache_resource(ttl=3600) # Cache the loaded credentials for efficiency
+# Also called from the background refresher thread, so problems are raised (and shown by the
+# sync error handling) rather than reported with st.error / st.stop here
+@st.cache_resource(ttl=3600, show_spinner=False) # Cache the loaded credentials for efficiency
 def _get_gcp_creds():
-    # --- RESTORED TO YOUR ORIGINAL WORKING LOGIC ---
     if not GCP_CREDS_FILE.exists():
-        st.error(f"Credentials file not found at: {GCP_CREDS_FILE}. Please ensure it exists in your 'assets/' folder.")
-        st.stop()
+        raise FileNotFoundError(f"Credentials file not found at: {GCP_CREDS_FILE}. Please ensure it exists in your 'assets/' folder.")
     try:
         with open(GCP_CREDS_FILE, "r") as f:
             creds_data = json.load(f)
         return creds_data
     except json.JSONDecodeError as e:
-        st.error(f"Error decoding JSON from credentials file {GCP_CREDS_FILE}: {e}. Please check its content for valid JSON.")
-        st.stop()
-    except Exception as e:
-        st.error(f"An unexpected error occurred while reading credentials file {GCP_CREDS_FILE}: {e}.")
-        st.stop()
-    # --- END RESTORED LOGIC ---
-
-
-# Function to fetch data from Google Sheet
-@st.cache_resource(ttl=3600) # Cache the connection and data for an hour (3600 seconds)
-def get_google_sheet_data():
-    try:
+        raise ValueError(f"Error decoding JSON from credentials file {GCP_CREDS_FILE}: {e}. Please check its content for valid JSON.") from e
+
+
+# --- Report store backend ---
+def _authorize_gspread_client():
+    if GSPREAD_CLIENT_FACTORY:
+        # "module:callable" returning a gspread-compatible client, e.g. the benchmark fake
+        module_name, _, factory_name = GSPREAD_CLIENT_FACTORY.partition(":")
+        return getattr(importlib.import_module(module_name), factory_name)()
+    with tracing.span("gspread.authorize"):
+        # Imported here rather than at the top: they're slow to import and only the Sheets backend needs them
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
         creds_info = _get_gcp_creds() # Get credentials from the file
-
         creds = ServiceAccountCredentials.from_json_keyfile_dict(
             creds_info, GOOGLE_SHEET_SCOPE
         )
-        client = gspread.authorize(creds)
-
-        # Open the sheet and select the worksheet tab
-        sheet = client.open(GOOGLE_SHEET_NAME)
-        worksheet = sheet.worksheet(GOOGLE_SHEET_TAB_NAME_RESULTS) # Use correct results tab name
-
-        # Get all records as a list of dictionaries
-        list_of_dicts = worksheet.get_all_records()
-
-        # Transform data into the desired JSON structure
-        sheet_data = {}
-        for row in list_of_dicts:
-            company_name = row.get("company_name")
-            if company_name:
-                report_details = {}
-                for part_key in ["Part 1: Corporate Governance and Management Credibility Assessment",
-                                 "Part 2: Operational Risk and Business Quality Analysis",
-                                 "Part 3: Holistic Investment Investigation Report"]:
-                    part_content = row.get(part_key, "") 
-                    try:
-                        if isinstance(part_content, str) and part_content.strip().startswith(("{", "[")):
-                            report_details[part_key] = json.loads(part_content)
-                        else:
-                            report_details[part_key] = part_content if part_content else {}
-                    except json.JSONDecodeError as e:
-                        report_details[part_key] = part_content
-                        #st.warning(f"Warning: Could not parse JSON for '{part_key}' of '{company_name}'. Data might be malformed. Error: {e}. Raw content: {part_content[:100]}...")
-
-
-                investment_score = row.get("Part 4: investment score", "N/A")
-                try:
-                    investment_score = int(investment_score)
-                except ValueError:
-                    pass 
-
-                company_report = {
-                    "output": {
-                        "company_name": company_name,
-                        "report_details": report_details,
-                        "Part 4: investment score": investment_score
-                    }
-                }
-                sheet_data[company_name] = [company_report]
-        return sheet_data
-
-    except gspread.exceptions.SpreadsheetNotFound:
+        return gspread.authorize(creds)
+
+@st.cache_resource # One authorized client per process, with retries, rate limiting and a circuit breaker
+def get_sheets_client():
+    return SheetsClient(_authorize_gspread_client)
+
+@st.cache_resource # One store per process; the data itself is cached below
+def get_report_store():
+    if REPORT_STORE_BACKEND == "sqlite":
+        try:
+            return SQLiteReportStore(REPORT_STORE_SQLITE_PATH)
+        except sqlite3.Error as error:
+            st.error(f"Error opening the report store '{REPORT_STORE_SQLITE_PATH}': {error}. Fill it with report_store.copy_store first.")
+            st.stop()
+    if REPORT_STORE_BACKEND == "google_sheets":
+        return GoogleSheetsReportStore(
+            get_sheets_client(),
+            GOOGLE_SHEET_NAME,
+            GOOGLE_SHEET_TAB_NAME_RESULTS,
+            GOOGLE_SHEET_TAB_NAME_STOCKS,
+        )
+    st.error(f"Unknown REPORT_STORE_BACKEND '{REPORT_STORE_BACKEND}'. Use 'google_sheets' or 'sqlite'.")
+    st.stop()
+
+
+@st.cache_resource # One append-only version history per process, fed by the sync engine
+def get_report_history():
+    if not REPORT_HISTORY:
+        return None
+    try:
+        return ReportHistory(REPORT_HISTORY_PATH)
+    except (OSError, sqlite3.Error):
+        return None # Reports are still served; only the history views go missing
+
+@st.cache_resource # Long-lived: keeps the parsed reports and row hashes between syncs
+def get_report_sync_engine():
+    report_sync_engine = ReportSyncEngine(
+        get_report_store(), REPORT_SNAPSHOT_PATH, compress_bodies=REPORT_BODY_COMPRESSION, history=get_report_history(),
+    )
+    report_sync_engine.restore() # Serve the on-disk snapshot straight away after a restart
+    return report_sync_engine
+
+@st.cache_resource # Long-lived: keeps the last good stock name list between syncs
+def get_stock_name_sync():
+    stock_name_sync = StockNameSync(get_report_store(), STOCK_NAMES_SNAPSHOT_PATH)
+    stock_name_sync.restore()
+    return stock_name_sync
+
+
+def _is_gspread_error(error, name):
+    gspread = sys.modules.get("gspread") # not loaded at all unless the Sheets backend has been used
+    return gspread is not None and isinstance(error, getattr(gspread.exceptions, name))
+
+
+# Shared error reporting for both sheet tabs; the last good snapshot is kept either way
+def _report_sync_error(error, tab_name, what, snapshot_sync):
+    if isinstance(error, SheetsUnavailable):
+        if snapshot_sync.loaded:
+            st.warning(f"Google Sheets is busy right now; showing {what} from {int(snapshot_sync.age // 60)} minute(s) ago.")
+        else:
+            st.error(f"Google Sheets is unavailable right now ({error}). Please try again in a few minutes.")
+    elif isinstance(error, KeyError):
+        st.error(f"Error: '{STOCK_NAME_COLUMN}' column not found in '{tab_name}' tab.")
+    elif isinstance(error, (FileNotFoundError, ValueError)):
+        st.error(f"Error: {error}") # Missing or unreadable credentials file; not retried, so shown straight away
+    elif _is_gspread_error(error, "SpreadsheetNotFound"):
         st.error(f"Error: Google Sheet '{GOOGLE_SHEET_NAME}' not found. Please check the sheet name and sharing permissions.")
-        return {}
-    except gspread.exceptions.WorksheetNotFound:
-        st.error(f"Error: Worksheet tab '{GOOGLE_SHEET_TAB_NAME_RESULTS}' not found in '{GOOGLE_SHEET_NAME}'. Please check the tab name.")
-        return {}
-    except Exception as e:
-        st.error(f"An unexpected error occurred while accessing Google Sheet for results: {e}. Please ensure:\n"
+    elif _is_gspread_error(error, "WorksheetNotFound"):
+        st.error(f"Error: Worksheet tab '{tab_name}' not found in '{GOOGLE_SHEET_NAME}'. Please check the tab name.")
+    elif isinstance(error, sqlite3.Error):
+        st.error(f"Error reading {what} from '{REPORT_STORE_SQLITE_PATH}': {error}.")
+    else:
+        st.error(f"An unexpected error occurred while accessing Google Sheet for {what}: {error}. Please ensure:\n"
                  f"- The file '{GCP_CREDS_FILE}' contains valid JSON.\n"
                  f"- The service account has editor access to the Google Sheet '{GOOGLE_SHEET_NAME}'.\n"
                  f"- The sheet name and tab name are exact.")
-        return {}
+
+
+# Warm both tabs at boot and keep refreshing them ahead of expiry, off the request threads.
+# The thread is stopped when the cached refresher is cleared, so a cache clear doesn't leave two running.
+@st.cache_resource(on_release=lambda refresher: refresher.stop())
+def start_background_refresher():
+    report_sync_engine = get_report_sync_engine()
+    stock_name_sync = get_stock_name_sync()
+    def warm_report_caches():
+        _build_company_browse_index(report_sync_engine.reports, get_sample_reports(), report_sync_engine.generation)
+        _report_text_index().update(ChainMap(report_sync_engine.reports, get_sample_reports()), version=report_sync_engine.generation)
+    return BackgroundRefresher([
+        (report_sync_engine, REPORT_SYNC_INTERVAL, warm_report_caches),
+        (stock_name_sync, STOCK_NAMES_SYNC_INTERVAL,
+         lambda: _build_stock_name_index(stock_name_sync.names, stock_name_sync.generation)),
+    ]).start()
+
+# Tabs whose sync failure has already been shown in this rerun. The data getters below are called
+# several times per rerun; module globals start over on every rerun, since the whole script runs again.
+_sync_errors_reported = set()
+
+def _report_sync_error_once(error, tab_name, what, snapshot_sync):
+    if tab_name not in _sync_errors_reported:
+        _sync_errors_reported.add(tab_name)
+        _report_sync_error(error, tab_name, what, snapshot_sync)
+
+# Refresh a snapshot if it's due: inline only when nothing is loaded yet, otherwise in the background
+def _refresh_snapshot(snapshot_sync, max_age, tab_name, what, span_name):
+    with tracing.span(span_name) as span:
+        was_loaded, last_attempt = snapshot_sync.loaded, snapshot_sync.last_attempt
+        try:
+            snapshot_sync.sync_if_stale(max_age, background=True)
+        except Exception as e:
+            span.set(cache="miss", error=type(e).__name__)
+            _report_sync_error_once(e, tab_name, what, snapshot_sync)
+            return
+        if snapshot_sync.last_attempt == last_attempt:
+            span.set(cache="hit")
+        else:
+            # "miss": this rerun waited on the sync; "stale": served old data while refreshing behind it
+            span.set(cache="stale" if was_loaded else "miss")
+    if snapshot_sync.last_error is not None:
+        # A background refresh failed; we're still serving the previous data
+        _report_sync_error_once(snapshot_sync.last_error, tab_name, what, snapshot_sync)
+
+# Function to fetch all reports from the configured report store
+def get_google_sheet_data():
+    report_sync_engine = get_report_sync_engine()
+    # Only new or changed rows are re-parsed; the rest is reused from the previous sync
+    _refresh_snapshot(report_sync_engine, REPORT_SYNC_INTERVAL, GOOGLE_SHEET_TAB_NAME_RESULTS, "results", "get_google_sheet_data")
+    return report_sync_engine.reports
 
 # Function to fetch all stock names from the "stocks" sheet
-@st.cache_resource(ttl=3600)
 def get_all_stock_names():
-    try:
-        creds_info = _get_gcp_creds()
+    stock_name_sync = get_stock_name_sync()
+    _refresh_snapshot(stock_name_sync, STOCK_NAMES_SYNC_INTERVAL, GOOGLE_SHEET_TAB_NAME_STOCKS, "stock names", "get_all_stock_names")
+    return stock_name_sync.names
 
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(
-            creds_info, GOOGLE_SHEET_SCOPE
+# Autocomplete index over the stock names; rebuilt only when the name list actually changes
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _build_stock_name_index(_stock_names, generation):
+    return StockNameIndex(_stock_names)
+
+def get_stock_name_index():
+    stock_names = get_all_stock_names()
+    return _build_stock_name_index(stock_names, get_stock_name_sync().generation)
+
+
+# Any spelling or ticker of a company -> the name its report is stored under, rebuilt only when a name list changes
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _build_company_name_resolver(_sheet_data, _sample_reports, _stock_names, report_generation, stock_generation):
+    return CompanyNameResolver([*_sheet_data, *_sample_reports], _stock_names, load_aliases(COMPANY_ALIASES_PATH))
+
+def get_company_name_resolver():
+    return _build_company_name_resolver(
+        get_google_sheet_data(), get_sample_reports(), get_all_stock_names(),
+        get_report_sync_engine().generation, get_stock_name_sync().generation,
+    )
+
+def resolve_company_name(stock_name):
+    # Unknown names are kept as typed (trimmed), so a store lookup can still try them
+    stock_name = stock_name.strip()
+    return get_company_name_resolver().resolve(stock_name) or stock_name
+
+
+# Reports already in memory: this session's overlay, then the shared sheet snapshot, then the samples
+def _lookup_cached_report(stock_name):
+    for reports in (st.session_state.report_overlay, get_google_sheet_data(), get_sample_reports()):
+        report_data_list = reports.get(stock_name)
+        if report_data_list:
+            return report_data_list
+    return None
+
+
+# Function to fetch data from memory or the report store
+def fetch_data(stock_name: str):
+    stock_name = resolve_company_name(stock_name)
+    with tracing.span("fetch_data", stock=stock_name) as span:
+        report_data_list = _lookup_cached_report(stock_name)
+        span.set(cache="hit" if report_data_list else "miss")
+        if report_data_list:
+            return report_data_list
+
+        _, report_data_list = next(fetch_data_batch([stock_name]))
+    if report_data_list:
+        st.success(f"Successfully fetched '{stock_name}' from the report store.")
+    return report_data_list
+
+
+# Resolve many stocks at once, yielding (stock_name, report_data_list or None) as each becomes available
+def fetch_data_batch(stock_names, chunk_size=BATCH_FETCH_CHUNK_SIZE):
+    misses = []
+    for stock_name in stock_names:
+        report_data_list = _lookup_cached_report(resolve_company_name(stock_name))
+        if report_data_list:
+            yield stock_name, report_data_list
+        else:
+            misses.append(stock_name)
+
+    report_store = get_report_store()
+    if not misses or not report_store.indexed:
+        # Non-indexed stores are fully held by the sync engine, so a miss there is a real miss
+        for stock_name in misses:
+            yield stock_name, None
+        return
+
+    # Rows added since the last sync: small bulk reads so the first reports show before the last are read
+    for start in range(0, len(misses), chunk_size):
+        chunk = {stock_name: resolve_company_name(stock_name) for stock_name in misses[start:start + chunk_size]}
+        with tracing.span("fetch_data_batch.store_read", stocks=len(chunk)) as span:
+            try:
+                found = report_store.get_reports(list(chunk.values()))
+            except sqlite3.Error:
+                found = {}
+            span.set(found=len(found))
+        for stock_name, company_name in chunk.items():
+            report_data_list = found.get(company_name)
+            if report_data_list:
+                st.session_state.report_overlay[company_name] = report_data_list
+            yield stock_name, report_data_list
+
+
+# --- Bulk export ---
+def _export_source(company_names):
+    # Captured now: the download callable runs on its own thread, outside this session's script run
+    cached = (dict(st.session_state.report_overlay), get_google_sheet_data(), get_sample_reports())
+    report_store = get_report_store()
+
+    def reports():
+        misses = []
+        for company_name in company_names:
+            report_data_list = next((r[company_name] for r in cached if r.get(company_name)), None)
+            if report_data_list:
+                yield company_name, report_data_list
+            else:
+                misses.append(company_name)
+        if not report_store.indexed:
+            return
+        for start in range(0, len(misses), BATCH_FETCH_CHUNK_SIZE):
+            try:
+                found = report_store.get_reports(misses[start:start + BATCH_FETCH_CHUNK_SIZE])
+            except sqlite3.Error:
+                continue
+            yield from found.items()
+    return reports
+
+
+def _render_export_controls(company_names, key):
+    col_format, col_download = st.columns([0.5, 0.5])
+    with col_format:
+        export_format = st.selectbox("Export format", options=list(EXPORT_FORMATS), key=f"{key}_format", label_visibility="collapsed")
+    extension, mime = EXPORT_FORMATS[export_format]
+    source = _export_source(tuple(company_names))
+
+    def build_export():
+        with tracing.span("export_reports", format=extension, companies=len(company_names)):
+            return export_reports(export_format, source())
+
+    with col_download:
+        # The file is only generated (in memory) once the button is clicked, off the script thread
+        st.download_button(
+            f"Download {len(company_names)} report(s)",
+            data=build_export,
+            file_name=f"stock_reports.{extension}",
+            mime=mime,
+            key=f"{key}_download",
+            on_click="ignore",
         )
-        client = gspread.authorize(creds)
 
-        sheet = client.open(GOOGLE_SHEET_NAME)
-        worksheet = sheet.worksheet(GOOGLE_SHEET_TAB_NAME_STOCKS) # Use correct stocks tab name
 
-        # Get all values from the "Stocks_name" column
-        # Assuming "Stocks_name" is in the first row (header)
-        header = worksheet.row_values(1)
-        if "Stocks_name" not in header:
-            st.error(f"Error: 'Stocks_name' column not found in '{GOOGLE_SHEET_TAB_NAME_STOCKS}' tab.")
-            return []
-        
-        col_index = header.index("Stocks_name") + 1 # gspread is 1-indexed
+# Scores, percentile ranks and Part 2 factor assessments for every company, built once per snapshot
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _build_score_table(_sheet_data, _sample_reports, generation):
+    return build_score_table(ChainMap(_sheet_data, _sample_reports)) # sheet rows win over the samples
 
-        # Get all values from that column, skipping the header
-        stock_names = worksheet.col_values(col_index)[1:] 
-        return [name.strip() for name in stock_names if name.strip()]
 
-    except gspread.exceptions.SpreadsheetNotFound:
-        st.error(f"Error: Google Sheet '{GOOGLE_SHEET_NAME}' not found. Please check the sheet name and sharing permissions.")
-        return []
-    except gspread.exceptions.WorksheetNotFound:
-        st.error(f"Error: Worksheet tab '{GOOGLE_SHEET_TAB_NAME_STOCKS}' not found in '{GOOGLE_SHEET_NAME}'. Please check the tab name.")
-        return []
-    except Exception as e:
-        st.error(f"An unexpected error occurred while accessing Google Sheet for stock names: {e}. Please ensure:\n"
-                 f"- The file '{GCP_CREDS_FILE}' contains valid JSON.\n"
-                 f"- The service account has editor access to the Google Sheet '{GOOGLE_SHEET_NAME}'.\n"
-                 f"- The sheet name and tab name are exact.")
+def get_score_table():
+    return _build_score_table(get_google_sheet_data(), get_sample_reports(), get_report_sync_engine().generation)
+
+
+# Presorted company list with scores for the Browse tab, built once per snapshot rather than on every rerun
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _build_company_browse_index(_sheet_data, _sample_reports, generation):
+    return CompanyBrowseIndex(_sheet_data.keys() | _sample_reports.keys(), _build_score_table(_sheet_data, _sample_reports, generation))
+
+
+def get_company_browse_index():
+    browse_index = _build_company_browse_index(get_google_sheet_data(), get_sample_reports(), get_report_sync_engine().generation)
+    overlay_only = [name for name in st.session_state.report_overlay if name not in browse_index]
+    if overlay_only:
+        # Reports this session read straight from the store; rare enough not to cache
+        return CompanyBrowseIndex((*browse_index.names, *overlay_only), get_score_table())
+    return browse_index
+
+
+def _reset_browse_page():
+    st.session_state.browse_page = 1 # a changed filter starts again from the first page
+
+
+def _select_browse_row(companies, table_key):
+    # Clicking a row in the Browse table opens that company's report
+    rows = st.session_state[table_key].selection.rows
+    if rows:
+        st.session_state.browse_company = companies[rows[0]]
+
+
+# One inverted index over Parts 1-3 of every report, updated in place as the snapshot changes
+@st.cache_resource(show_spinner=False)
+def _report_text_index():
+    return ReportTextIndex()
+
+
+def get_report_text_index():
+    index = _report_text_index()
+    with tracing.span("report_text_index.update") as span:
+        added, removed = index.update(ChainMap(get_google_sheet_data(), get_sample_reports()), version=get_report_sync_engine().generation)
+        span.set(docs_added=added, docs_removed=removed, docs=len(index))
+    return index
+
+
+def _open_text_search_hit(company_name, part_key):
+    # Point the Browse selectbox at the company and switch the matching section on
+    st.session_state.browse_company = company_name
+    st.session_state[f"browse:{company_name}:{part_key}"] = True
+
+
+# --- Report history: what changed, and when ---
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _recent_report_changes(_report_history, recorded_generation):
+    return _report_history.recent_changes(RECENTLY_UPDATED_LIMIT)
+
+
+def get_recent_report_changes():
+    # Read from the version index, re-queried only after the history records a new snapshot
+    report_history = get_report_history()
+    if report_history is None:
         return []
+    return _recent_report_changes(report_history, report_history.recorded_generation)
 
 
-# Function to fetch data from MOCK_DATABASE or Google Sheet
-def fetch_data(stock_name: str):
-    time.sleep(0.5)
+@st.cache_resource(max_entries=64, show_spinner=False) # Versions never change once recorded
+def _report_diff(before_id, after_id, _before, _after):
+    return get_report_history().diff(_before, _after)
 
-    if stock_name in st.session_state.MOCK_DATABASE:
-        return st.session_state.MOCK_DATABASE.get(stock_name)
 
-    google_sheet_data = get_google_sheet_data()
+def _version_label(version):
+    return f"{datetime.fromtimestamp(version.recorded_at):%Y-%m-%d %H:%M} ({version.change})"
 
-    if stock_name in google_sheet_data:
-        st.session_state.MOCK_DATABASE[stock_name] = google_sheet_data[stock_name]
-        st.success(f"Successfully fetched '{stock_name}' from Google Sheet.")
-        return st.session_state.MOCK_DATABASE.get(stock_name)
-    else:
-        return None
+
+def _open_browse_company(company_name):
+    st.session_state.browse_company = company_name
+
+
+def _render_report_history(company_name):
+    report_history = get_report_history()
+    if report_history is None:
+        return
+    versions = report_history.versions(company_name)
+    if len(versions) < 2:
+        return
+    latest = versions[0]
+    with st.expander(f"What changed since the last version ({len(versions)} versions recorded)"):
+        before = st.selectbox(
+            "Compare the latest version with:",
+            options=versions[1:],
+            format_func=_version_label,
+            key=f"history:{company_name}",
+        )
+        diff = _report_diff(before.id, latest.id, before, latest)
+        if diff.score_changed:
+            delta = None
+            if isinstance(latest.investment_score, int) and isinstance(before.investment_score, int):
+                delta = latest.investment_score - before.investment_score
+            st.metric("Overall Investment Score", latest.investment_score, delta=delta)
+        for part in diff.parts:
+            title = SECTION_TITLES[part.part_key].strip("*")
+            if part.status == "unchanged":
+                st.caption(f"{title}: unchanged")
+            elif part.status == "changed":
+                st.markdown(f"**{title}**: {len(part.rows)} field(s) changed")
+                changes = pd.DataFrame(part.rows, columns=["Field", "Before", "After"]).fillna("").astype(str)
+                st.dataframe(changes, width="stretch", hide_index=True)
+            else:
+                st.markdown(f"**{title}**: {part.status}")
+
+
+def _ordinal(number):
+    suffix = "th" if 10 <= number % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+    return f"{number}{suffix}"
 
 # --- REPORT DISPLAY FUNCTION ---
-def display_report(report_dictionary):
+def display_report(report_dictionary, key_prefix="report"):
     output_data = report_dictionary.get("output", {})
-    st.header(f"Analysis for: {output_data.get('company_name', 'N/A')}")
-    st.metric(label="Overall Investment Score", value=output_data.get('Part 4: investment score', 'N/A'))
+    with tracing.span(
+        "display_report",
+        company=output_data.get("company_name"),
+        payload_bytes=raw_text_length(output_data.get("report_details", {})),
+    ) as span:
+        span.set(sections_rendered=_render_report(output_data, key_prefix))
+
+
+# Flattened render blocks for one report section, shared by every session and keyed by content hash
+@st.cache_resource(max_entries=512, show_spinner=False)
+def _section_blocks(content_hash, part_key, _report_details):
+    return build_section_blocks(part_key, _report_details.get(part_key, {})) # only parsed on a cache miss
+
+
+def _render_report(output_data, key_prefix):
+    company_name = output_data.get('company_name', 'N/A')
+    st.header(f"Analysis for: {company_name}")
+    col_score, col_rank = st.columns(2)
+    with col_score:
+        st.metric(label="Overall Investment Score", value=output_data.get('Part 4: investment score', 'N/A'))
+    percentile = percentile_of(get_score_table(), company_name)
+    if percentile is not None:
+        with col_rank:
+            st.metric(label="Percentile Rank", value=_ordinal(int(percentile)), help="Share of all companies scoring at or below this one.")
     report_details = output_data.get("report_details", {})
 
-    part1 = report_details.get("Part 1: Corporate Governance and Management Credibility Assessment", {})
-    if part1:
-        with st.expander("**Part 1: Corporate Governance and Management Credibility Assessment**", expanded=False):
-            if isinstance(part1, dict):
-                for k, v in part1.items():
-                    st.subheader(k)
-                    if isinstance(v, dict):
-                        for sub_k, sub_v in v.items():
-                            st.markdown(f"**{sub_k}**")
-                            if isinstance(sub_v, dict):
-                                for deep_k, deep_v in sub_v.items():
-                                    st.write(f"- **{deep_k}:** {deep_v}")
-                            else:
-                                st.write(sub_v)
-                    else:
-                        st.write(v)
-            else:
-                st.write(part1)
-
-
-    part2 = report_details.get("Part 2: Operational Risk and Business Quality Analysis", {})
-    if part2:
-        with st.expander("**Part 2: Operational Risk & Business Quality**", expanded=False):
-            st.subheader("Summary Table")
-            summary_table = part2.get("summary_table")
-            if isinstance(summary_table, list) and all(isinstance(i, dict) for i in summary_table):
-                st.dataframe(pd.DataFrame(summary_table), use_container_width=True, hide_index=True)
-            elif summary_table:
-                st.write("Summary table data is not in the expected tabular format:")
-                st.write(summary_table)
-            else:
-                st.write("No summary table data available or it is empty.")
-
-
-            st.subheader("Overall Risk Assessment")
-            st.write(part2.get("Overall Risk Assessment", "N/A"))
-
-    part3 = report_details.get("Part 3: Holistic Investment Investigation Report", {})
-    if part3:
-        with st.expander("**Part 3: Holistic Investment Investigation**", expanded=False):
-            if isinstance(part3, dict):
-                for k, v in part3.items():
-                    st.subheader(k)
-                    if isinstance(v, dict):
-                        for sub_k, sub_v in v.items():
-                            st.markdown(f"**{sub_k}**")
-                            if isinstance(sub_v, dict):
-                                if sub_k == "IRR Projections" and all(isinstance(val, str) for val in sub_v.values()):
-                                    st.table(pd.DataFrame.from_dict(sub_v, orient='index', columns=["Scenario"]).rename_axis("Investment Style"))
-                                else:
-                                    st.write(sub_v)
-                            else:
-                                st.markdown(sub_v)
-                    else:
-                        st.write(v)
-            else:
-                st.write(part3)
+    # Sections are only built and sent to the browser once their toggle is switched on
+    sections_rendered = 0
+    for part_key, title in SECTION_TITLES.items():
+        if not part_has_content(report_details, part_key):
+            continue
+        if not st.toggle(title, key=f"{key_prefix}:{company_name}:{part_key}"):
+            continue
+        sections_rendered += 1
+        blocks = _section_blocks(part_content_hash(report_details, part_key), part_key, report_details)
+        with st.container(border=True):
+            for kind, value in blocks:
+                if kind == DATAFRAME:
+                    st.dataframe(value, width="stretch", hide_index=True)
+                elif kind == TABLE:
+                    st.table(value)
+                elif kind == MARKDOWN:
+                    st.markdown(value)
+                else:
+                    st.write(value)
+    return sections_rendered
+
+
+# --- Process-wide setup (a no-op on later reruns) ---
+@st.cache_resource
+def _configure_tracing():
+    tracing.configure(TRACE_FILE)
+    return True
+
+_configure_tracing()
+if BACKGROUND_REFRESH:
+    start_background_refresher()
 
 
 # --- UI STYLES AND HEADER ---
-logo_base64 = get_image_as_base64(Path("assets/logo.png"))
-
-st.markdown(f"""
+# Built once per process; every rerun just sends the cached string
+@st.cache_resource(show_spinner=False)
+def _header_html():
+    logo_base64 = get_image_as_base64(LOGO_PATH) or ""
+    return f"""
     <style>
         .stApp {{
             background-color: #0a192f;
@@ -366,7 +708,11 @@ st.markdown(f"""
         <img src="data:image/png;base64,{logo_base64}">
         <p class="title">Utopiaequity</p>
     </div>
-""", unsafe_allow_html=True)
+"""
+
+if not LOGO_PATH.exists():
+    st.error(f"Logo file not found at: {LOGO_PATH}. Please ensure 'assets/logo.png' exists.")
+st.markdown(_header_html(), unsafe_allow_html=True)
 
 
 # --- Initialize session state for selected stocks if not already present ---
@@ -381,12 +727,13 @@ if "reports_to_display_in_tab1" not in st.session_state: # New state to hold rep
 
 
 # --- TABS FOR NAVIGATION ---
-tab1, tab2 = st.tabs(["Analyze Specific Stocks", "Browse All Reports"])
+tab1, tab2, tab3 = st.tabs(["Analyze Specific Stocks", "Browse All Reports", "Leaderboard"])
 
 # This helper function will be used by the selectbox's on_change
 def _add_selected_stock_from_dropdown(selected_value):
-    if selected_value and selected_value not in st.session_state.selected_stocks_for_analysis:
-        st.session_state.selected_stocks_for_analysis.append(selected_value)
+    company_name = resolve_company_name(selected_value) if selected_value else selected_value
+    if company_name and company_name not in st.session_state.selected_stocks_for_analysis:
+        st.session_state.selected_stocks_for_analysis.append(company_name) # canonical, like the Add button
         st.session_state.current_input_stock = "" # Clear text input
         st.session_state.last_selected_suggestion = selected_value # Store for persistence
         # No clearing of reports_to_display_in_tab1 here
@@ -404,8 +751,8 @@ def _clear_all_tab1_selections():
 with tab1:
     st.header("Analyze Stocks by Name")
 
-    # Fetch all available stock names for autocomplete
-    all_available_stock_names = get_all_stock_names()
+    # Search index over all available stock names for autocomplete (built once per name list)
+    stock_name_index = get_stock_name_index()
 
     # Input for typing stock names. on_change is key for dynamic updates.
     user_input = st.text_input(
@@ -416,14 +763,18 @@ with tab1:
         on_change=lambda: st.session_state.update(current_input_stock=st.session_state.autocomplete_input, last_selected_suggestion="") # Update input, clear last suggestion on text change
     )
 
-    # Filter suggestions based on current user input
+    # Ranked suggestions for the current input: prefix matches first, then substring and typo matches
     suggestions = []
+    resolved_input = resolve_company_name(user_input) if user_input else ""
     if user_input:
-        suggestions = [
-            name for name in all_available_stock_names
-            if user_input.lower() in name.lower() and name not in st.session_state.selected_stocks_for_analysis
-        ]
-        suggestions.sort() # Keep suggestions sorted
+        suggestions = stock_name_index.search(
+            user_input,
+            limit=AUTOCOMPLETE_SUGGESTION_LIMIT,
+            exclude=set(st.session_state.selected_stocks_for_analysis),
+        )
+        # A ticker or alternate spelling that resolves to a known company goes to the top
+        if resolved_input != user_input.strip() and resolved_input not in st.session_state.selected_stocks_for_analysis:
+            suggestions = [resolved_input] + [name for name in suggestions if name != resolved_input][:AUTOCOMPLETE_SUGGESTION_LIMIT - 1]
 
     # Display suggestions in a selectbox. It will appear/disappear dynamically.
     if suggestions:
@@ -464,9 +815,9 @@ with tab1:
                     st.rerun() # Rerun to update the list and clear reports
 
     # Manually add stock from text input if it's not empty and not already added
-    if user_input and user_input not in st.session_state.selected_stocks_for_analysis:
+    if user_input and resolved_input not in st.session_state.selected_stocks_for_analysis:
         if st.button(f"Add '{user_input}' to list"):
-            st.session_state.selected_stocks_for_analysis.append(user_input)
+            st.session_state.selected_stocks_for_analysis.append(resolved_input) # stored under its canonical name
             st.session_state.current_input_stock = "" # Clear input after adding
             st.session_state.last_selected_suggestion = "" # Reset suggestion state
             # No clearing of reports_to_display_in_tab1 here
@@ -492,45 +843,220 @@ with tab1:
         if st.session_state.selected_stocks_for_analysis or st.session_state.current_input_stock or st.session_state.reports_to_display_in_tab1:
             st.button("Clear All Selections & Reports", on_click=_clear_all_tab1_selections)
 
+    if st.session_state.selected_stocks_for_analysis:
+        st.markdown("##### Export selected stocks")
+        _render_export_controls(st.session_state.selected_stocks_for_analysis, key="tab1_export")
+
 
     # Display reports only if reports_to_display_in_tab1 is populated
     if st.session_state.reports_to_display_in_tab1:
         st.subheader("Generated Reports:")
-        for stock_name in st.session_state.reports_to_display_in_tab1:
-            with st.spinner(f"Fetching data for {stock_name}..."):
-                report_data_list = fetch_data(stock_name)
-            if report_data_list:
-                display_report(report_data_list[0])
-            else:
-                st.error(f"No data found for '{stock_name}'. Please ensure the name is correct and it exists in the Google Sheet.")
-            st.divider()
+        # One slot per company (two spellings of a name are one company), so reports keep the list order while they stream in
+        stocks_to_display = list(dict.fromkeys(resolve_company_name(stock_name) for stock_name in st.session_state.reports_to_display_in_tab1))
+        report_slots = {stock_name: (slot_index, st.container()) for slot_index, stock_name in enumerate(stocks_to_display)}
+        with st.spinner(f"Fetching data for {len(report_slots)} stock(s)..."), tracing.span("generate_reports", stocks=len(report_slots)):
+            for stock_name, report_data_list in fetch_data_batch(stocks_to_display):
+                slot_index, slot = report_slots[stock_name]
+                with slot:
+                    if report_data_list:
+                        display_report(report_data_list[0], key_prefix=f"tab1:{slot_index}")
+                    else:
+                        st.error(f"No data found for '{stock_name}'. Please ensure the name is correct and it exists in the Google Sheet.")
+                    st.divider()
 
 
 with tab2:
     st.header("Browse All Available Reports")
 
-    # Ensure mock database is populated with Google Sheet data for Browse
-    # This ensures that Tab 2 always pulls the latest data
-    google_sheet_data_all = get_google_sheet_data()
-    st.session_state.MOCK_DATABASE.update(google_sheet_data_all)
+    # Names come from the shared snapshot (kept fresh by the sync engine) plus this session's overlay
+    browse_index = get_company_browse_index()
 
-    all_company_names_available = list(st.session_state.MOCK_DATABASE.keys())
+    # ?company=NATCOPHARM (or any spelling) opens that report
+    linked_company = st.query_params.get("company")
+    if linked_company and st.session_state.get("browse_linked_company") != linked_company:
+        st.session_state.browse_linked_company = linked_company
+        if resolve_company_name(linked_company) in browse_index:
+            st.session_state.browse_company = resolve_company_name(linked_company)
 
-    if not all_company_names_available:
+    if len(browse_index):
+        with st.expander(f"Export all {len(browse_index)} reports"):
+            _render_export_controls(browse_index.names, key="browse_export")
+
+    text_query = st.text_input(
+        "Search report contents:",
+        key="report_text_query",
+        placeholder='e.g. promoter pledge, related party',
+    )
+    if text_query.strip():
+        with tracing.span("report_text_search") as span:
+            text_hits = get_report_text_index().search(text_query, limit=TEXT_SEARCH_RESULT_LIMIT)
+            span.set(hits=len(text_hits))
+        if not text_hits:
+            st.info(f"No report mentions '{text_query}'.")
+        else:
+            st.caption(f"Top {len(text_hits)} matching sections. Open one to view it below.")
+            with st.container(height=320):
+                for i, hit in enumerate(text_hits):
+                    col_hit, col_open = st.columns([0.8, 0.2])
+                    with col_hit:
+                        st.markdown(f"**{hit.company_name}** · {SECTION_TITLES[hit.part_key].strip('*')}")
+                        st.caption(hit.snippet)
+                    with col_open:
+                        st.button("Open", key=f"text_hit:{i}", on_click=_open_text_search_hit, args=(hit.company_name, hit.part_key))
+
+    recent_changes = get_recent_report_changes()
+    if recent_changes:
+        with st.expander(f"Recently updated ({len(recent_changes)})"):
+            for version in recent_changes:
+                col_change, col_open = st.columns([0.8, 0.2])
+                with col_change:
+                    st.markdown(f"**{version.company_name}** · {version.change}")
+                    st.caption(f"{datetime.fromtimestamp(version.recorded_at):%Y-%m-%d %H:%M}")
+                if version.change != REMOVED and version.company_name in browse_index:
+                    with col_open:
+                        st.button("Open", key=f"recent:{version.company_name}", on_click=_open_browse_company, args=(version.company_name,))
+
+    if not len(browse_index):
         st.warning("No reports available to browse. Please analyze a stock first or check Google Sheet connection.")
     else:
-        all_company_names_available.sort()
-
-        selected_company = st.selectbox(
-            "Select a company to view its report:",
-            options=all_company_names_available,
-            index=0 if all_company_names_available else None,
-            label_visibility="collapsed"
-        )
+        # Filtering and paging happen on the server; only the visible page is sent to the browser
+        col_query, col_letter, col_page_size = st.columns([0.55, 0.2, 0.25])
+        with col_query:
+            browse_query = st.text_input("Filter companies by name:", key="browse_query", placeholder="e.g. pharma", on_change=_reset_browse_page)
+        with col_letter:
+            browse_letter = st.selectbox("First letter:", options=["All", *browse_index.letters], key="browse_letter", on_change=_reset_browse_page)
+        with col_page_size:
+            page_size = st.selectbox("Rows per page:", options=BROWSE_PAGE_SIZES, key="browse_page_size", on_change=_reset_browse_page)
+        browse_score_range = None
+        score_bounds = browse_index.score_bounds
+        if score_bounds is not None and int(score_bounds[0]) < math.ceil(score_bounds[1]):
+            full_range = (int(score_bounds[0]), math.ceil(score_bounds[1]))
+            picked_range = st.slider("Investment score:", *full_range, value=full_range, key="browse_score_range", on_change=_reset_browse_page)
+            if tuple(picked_range) != full_range:
+                browse_score_range = picked_range # unscored companies are only hidden once the range is narrowed
+
+        browse_filters = dict(query=browse_query, letter=None if browse_letter == "All" else browse_letter, score_range=browse_score_range)
+        with tracing.span("browse_page") as span:
+            browse_page = browse_index.page(st.session_state.get("browse_page", 1), page_size, **browse_filters)
+            span.set(matches=browse_page.total, rows=len(browse_page.rows))
+        if not browse_page.total:
+            st.info("No companies match these filters.")
+        else:
+            st.session_state.browse_page = browse_page.page # clamped when the filters shrink the result
+            # A new key per page and filter, so a row selection never carries over to a different list
+            table_key = f"browse_table:{browse_page.page}:{page_size}:{browse_filters}"
+            st.dataframe(
+                pd.DataFrame.from_records(browse_page.rows),
+                width="stretch",
+                hide_index=True,
+                column_config={PERCENTILE_COLUMN: st.column_config.NumberColumn(format="%.0f")},
+                key=table_key,
+                on_select=partial(_select_browse_row, browse_page.companies, table_key),
+                selection_mode="single-row",
+            )
+            col_showing, col_page = st.columns([0.7, 0.3])
+            with col_showing:
+                first_row = (browse_page.page - 1) * page_size + 1
+                st.caption(f"Companies {first_row}-{first_row + len(browse_page.rows) - 1} of {browse_page.total}. Select a row to open its report.")
+            with col_page:
+                st.number_input("Page:", min_value=1, max_value=browse_page.pages, step=1, key="browse_page")
+
+        # Opened from the table, a search hit, "Recently updated" or a ?company= link; else the first row shown
+        selected_company = st.session_state.get("browse_company")
+        if selected_company not in browse_index:
+            selected_company = browse_page.companies[0] if browse_page.companies else None
         if selected_company:
             with st.spinner(f"Loading report for {selected_company}..."):
                 report_data_list = fetch_data(selected_company)
             if report_data_list:
-                display_report(report_data_list[0])
+                display_report(report_data_list[0], key_prefix="browse")
+                _render_report_history(selected_company)
             else:
                 st.warning(f"Could not load report for {selected_company}.")
+
+
+with tab3:
+    st.header("Leaderboard")
+
+    score_table = get_score_table()
+    if score_table.empty:
+        st.warning("No reports available to rank yet. Please check Google Sheet connection.")
+    else:
+        scored = score_table[SCORE_COLUMN].dropna()
+        col_score_range, col_percentile = st.columns([0.5, 0.5])
+        with col_score_range:
+            low, high = (int(scored.min()), math.ceil(scored.max())) if not scored.empty else (0, 100)
+            full_range = (low, max(high, low + 1))
+            picked_range = st.slider("Investment score", *full_range, value=full_range, key="leaderboard_score_range")
+            # As in Browse, companies without a score are only hidden once the range is narrowed
+            score_range = picked_range if tuple(picked_range) != full_range else None
+        with col_percentile:
+            min_percentile = st.slider("Minimum percentile", min_value=0, max_value=100, value=0, key="leaderboard_min_percentile")
+
+        col_flags, col_search = st.columns([0.5, 0.5])
+        with col_flags:
+            exclude_flagged = st.multiselect("Exclude companies flagged YES for", options=factor_names(score_table), key="leaderboard_exclude_flagged")
+        with col_search:
+            name_query = st.text_input("Company name contains", key="leaderboard_name_query")
+
+        col_sort, col_order, col_limit = st.columns([0.5, 0.25, 0.25])
+        with col_sort:
+            sort_by = st.selectbox("Sort by", options=[SCORE_COLUMN, PERCENTILE_COLUMN, FLAGS_COLUMN, COMPANY_COLUMN], key="leaderboard_sort_by")
+        with col_order:
+            ascending = st.toggle("Ascending", value=sort_by in (FLAGS_COLUMN, COMPANY_COLUMN), key="leaderboard_ascending")
+        with col_limit:
+            row_limit = st.number_input("Rows", min_value=10, max_value=1000, value=100, step=10, key="leaderboard_rows")
+
+        leaderboard = filter_score_table(
+            score_table,
+            score_range=score_range,
+            min_percentile=min_percentile,
+            exclude_flagged=exclude_flagged,
+            name_query=name_query,
+            sort_by=sort_by,
+            ascending=ascending,
+        )
+        st.caption(f"{len(leaderboard)} of {len(score_table)} companies match.")
+        st.dataframe(
+            leaderboard.head(int(row_limit)),
+            width="stretch",
+            column_config={PERCENTILE_COLUMN: st.column_config.NumberColumn(format="%.0f")},
+        )
+
+
+# --- Opt-in debug panel: where did this rerun's time go? ---
+def _debug_panel_enabled():
+    return DEBUG_PANEL or st.query_params.get("debug") == "1"
+
+
+def _render_debug_panel(rerun):
+    with st.sidebar:
+        st.subheader("Hot path timings")
+        st.metric("This rerun so far", f"{rerun.elapsed_ms:.0f} ms")
+        span_rows = [
+            {"span": span.name, "ms": round(span.duration_ms, 2), **span.attrs}
+            for span in rerun.spans
+        ]
+        if span_rows:
+            st.dataframe(pd.DataFrame(span_rows), width="stretch", hide_index=True)
+
+        recent = list(tracing.recent_records)
+        session_reruns = [
+            {"rerun": r["rerun_id"], "ms": r["duration_ms"], "status": r["status"], "spans": r["spans"]}
+            for r in recent if r["kind"] == "rerun" and r["session_id"] == rerun.session_id
+        ][-10:]
+        if session_reruns:
+            st.caption("Recent reruns in this session")
+            st.dataframe(pd.DataFrame(session_reruns), width="stretch", hide_index=True)
+
+        background = [r for r in recent if r["session_id"] is None][-10:]
+        if background:
+            st.caption("Background work (sync, snapshots)")
+            st.dataframe(pd.DataFrame(background).drop(columns=["session_id", "rerun_id"]), width="stretch", hide_index=True)
+        if TRACE_FILE:
+            st.caption(f"Spans are also appended to `{TRACE_FILE}`.")
+
+
+if _debug_panel_enabled():
+    _render_debug_panel(rerun_trace)
+tracing.end_rerun(rerun_trace)
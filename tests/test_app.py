@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("streamlit")
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synthetic_sheet import SHEET_NAME, client_from_env, make_report_store
+from report_store import INVESTMENT_SCORE_KEY, SQLiteReportStore, copy_store
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+GENERATE_LABEL = "Generate Reports for Selected Stocks"
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    # The real app against the benchmark fake sheet, with every cache file in a temp dir
+    monkeypatch.chdir(REPO_ROOT) # assets/ is read relative to the working directory
+    monkeypatch.setenv("GSPREAD_CLIENT_FACTORY", "benchmarks.synthetic_sheet:client_from_env")
+    monkeypatch.setenv("SYNTHETIC_SHEET_COMPANIES", "200")
+    monkeypatch.setenv("BACKGROUND_REFRESH", "0")
+    monkeypatch.setenv("REPORT_HISTORY", "0")
+    monkeypatch.setenv("REPORT_SNAPSHOT_PATH", str(tmp_path / "reports.snapshot"))
+    monkeypatch.setenv("STOCK_NAMES_SNAPSHOT_PATH", str(tmp_path / "stock_names.json"))
+    st.cache_resource.clear()
+
+
+def _run_app():
+    app = AppTest.from_file(str(REPO_ROOT / "streamlit_app.py"), default_timeout=60)
+    app.run()
+    assert not app.exception
+    return app
+
+
+@pytest.fixture
+def app(app_env):
+    return _run_app()
+
+
+def _report_headers(app):
+    return [header.value for header in app.header if header.value.startswith("Analysis for:")]
+
+
+def test_two_spellings_of_one_company_generate_one_report(app):
+    app.session_state["selected_stocks_for_analysis"] = ["Indo Auto Ltd", "INDO AUTO"]
+    next(button for button in app.button if button.label == GENERATE_LABEL).click().run()
+    assert not app.exception
+    assert _report_headers(app).count("Analysis for: Indo Auto Ltd") == 1
+
+
+def test_dropdown_adds_the_canonical_name(app):
+    app.text_input(key="autocomplete_input").input("indo auto").run()
+    app.selectbox(key="suggestion_selectbox").select("Indo Auto Ltd").run()
+    app.text_input(key="autocomplete_input").input("INDO AUTO LIMITED").run()
+    assert not app.exception
+    assert app.session_state["selected_stocks_for_analysis"] == ["Indo Auto Ltd"]
+    assert not [button for button in app.button if button.label.startswith("Add '")]
+
+
+def unreadable_creds_client():
+    # GSPREAD_CLIENT_FACTORY target for a Sheets backend that can't authorize
+    raise ValueError("Error decoding JSON from credentials file assets/creds.json")
+
+
+def test_sync_failure_is_shown_once_per_rerun(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setenv("GSPREAD_CLIENT_FACTORY", f"{__name__}:unreadable_creds_client")
+    monkeypatch.setenv("BACKGROUND_REFRESH", "0")
+    monkeypatch.setenv("REPORT_HISTORY", "0")
+    monkeypatch.setenv("REPORT_SNAPSHOT_PATH", str(tmp_path / "reports.snapshot"))
+    monkeypatch.setenv("STOCK_NAMES_SNAPSHOT_PATH", str(tmp_path / "stock_names.json"))
+    st.cache_resource.clear()
+    app = AppTest.from_file(str(REPO_ROOT / "streamlit_app.py"), default_timeout=60)
+    for _ in range(2):
+        app.run()
+        assert not app.exception
+        messages = [error.value for error in app.error]
+        assert messages # one per sheet tab that failed to sync
+        assert len(messages) <= 2
+
+
+def _leaderboard_caption(app):
+    return next(caption.value for caption in app.caption if caption.value.endswith("companies match."))
+
+
+def test_leaderboard_keeps_unscored_companies_until_the_range_is_narrowed(app_env, monkeypatch):
+    rows = client_from_env().open(SHEET_NAME).worksheets["result_stocks"].rows
+    monkeypatch.setitem(rows[0], INVESTMENT_SCORE_KEY, "N/A")
+    app = _run_app()
+    companies = len(rows) + 2 # the two sample reports
+    assert _leaderboard_caption(app) == f"{companies} of {companies} companies match."
+
+    low, high = app.slider(key="leaderboard_score_range").value
+    app.slider(key="leaderboard_score_range").set_range(low, high - 1).run()
+    assert not app.exception
+    assert int(_leaderboard_caption(app).split()[0]) < companies - 1
+
+
+def test_sqlite_backend_serves_reports(app_env, tmp_path, monkeypatch):
+    copy_store(make_report_store(client_from_env()), SQLiteReportStore(tmp_path / "reports.db", create=True))
+    monkeypatch.setenv("REPORT_STORE_BACKEND", "sqlite")
+    monkeypatch.setenv("REPORT_STORE_SQLITE_PATH", str(tmp_path / "reports.db"))
+    monkeypatch.setenv("GSPREAD_CLIENT_FACTORY", f"{__name__}:unreadable_creds_client") # the sheet must not be read
+    app = _run_app()
+    assert not app.error
+    app.session_state["selected_stocks_for_analysis"] = ["Indo Auto Ltd"]
+    next(button for button in app.button if button.label == GENERATE_LABEL).click().run()
+    assert not app.exception
+    assert _report_headers(app).count("Analysis for: Indo Auto Ltd") == 1
+
+
+def test_missing_sqlite_file_is_reported(app_env, tmp_path, monkeypatch):
+    monkeypatch.setenv("REPORT_STORE_BACKEND", "sqlite")
+    monkeypatch.setenv("REPORT_STORE_SQLITE_PATH", str(tmp_path / "missing.db"))
+    app = AppTest.from_file(str(REPO_ROOT / "streamlit_app.py"), default_timeout=60)
+    app.run()
+    assert not app.exception
+    assert any("missing.db" in error.value for error in app.error)
+    assert not (tmp_path / "missing.db").exists()
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from company_browser import OTHER_LETTER, CompanyBrowseIndex
+from report_analytics import COMPANY_COLUMN, FLAGS_COLUMN, PERCENTILE_COLUMN, SCORE_COLUMN
+
+NAMES = [f"Company {i:03d} Ltd" for i in range(1, 96)] + ["alpha Corp", "Beta Ltd", "3M India Ltd", "Unscored Ltd"]
+
+
+@pytest.fixture
+def index():
+    scored = [name for name in NAMES if name != "Unscored Ltd"]
+    score_table = pd.DataFrame({
+        SCORE_COLUMN: [float(i % 10) for i in range(len(scored))],
+        PERCENTILE_COLUMN: [50.0] * len(scored),
+        FLAGS_COLUMN: [1] * len(scored),
+    }, index=pd.Index(scored, name=COMPANY_COLUMN))
+    return CompanyBrowseIndex(NAMES + ["Beta Ltd"], score_table)
+
+
+def test_names_are_deduplicated_and_sorted_case_insensitively(index):
+    assert len(index) == len(NAMES)
+    assert index.names[:2] == ("3M India Ltd", "alpha Corp")
+    assert index.letters[-1] == OTHER_LETTER
+
+
+@pytest.mark.parametrize("requested, expected", [(-3, 1), (0, 1), (1, 1), (4, 4), (5, 4), (99, 4)])
+def test_page_is_clamped_to_the_pages_that_exist(index, requested, expected):
+    page = index.page(requested, 25)
+    assert (page.page, page.pages, page.total) == (expected, 4, 99)
+    assert len(page.rows) == (24 if expected == 4 else 25)
+    assert page.companies == tuple(row[COMPANY_COLUMN] for row in page.rows)
+
+
+def test_pages_cover_every_company_once(index):
+    companies = [name for number in range(1, 5) for name in index.page(number, 25).companies]
+    assert companies == list(index.names)
+
+
+def test_no_match_is_one_empty_page(index):
+    page = index.page(3, 25, query="no such company")
+    assert (page.rows, page.total, page.page, page.pages) == ([], 0, 1, 1)
+
+
+def test_letter_query_and_score_filters_combine(index):
+    assert index.page(1, 25, letter="B").companies == ("Beta Ltd",)
+    assert index.page(1, 25, letter=OTHER_LETTER).companies == ("3M India Ltd",)
+    assert index.page(1, 25, query="  COMPANY 01").total == 10 # 010-019
+    page = index.page(1, 100, score_range=(9, 9))
+    assert page.total == 9 and all(row[SCORE_COLUMN] == 9.0 for row in page.rows)
+    assert index.page(1, 25, query="company 01", score_range=(0, 4)).total == 5
+
+
+def test_unscored_companies_are_listed_but_drop_out_of_a_score_filter(index):
+    row = index.page(1, 25, query="unscored").rows[0]
+    assert row[SCORE_COLUMN] is None and row[PERCENTILE_COLUMN] is None and row[FLAGS_COLUMN] is None
+    assert "Unscored Ltd" not in index.page(1, 100, score_range=index.score_bounds).companies
+    assert index.score_bounds == (0.0, 9.0)
+
+
+def test_filters_are_cached(index):
+    assert index.filter("beta") is index.filter("  Beta ")
+
+
+def test_letters_and_bounds_without_a_score_table():
+    index = CompanyBrowseIndex(["beta", "Alpha", "3M"])
+    assert index.letters == ("A", "B", OTHER_LETTER)
+    assert index.score_bounds is None
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from company_names import CompanyNameResolver, load_aliases, normalize_company_name
+
+ALIASES_PATH = Path(__file__).resolve().parent.parent / "assets" / "company_aliases.json"
+
+
+def test_normalize_ignores_case_punctuation_and_legal_suffixes():
+    assert normalize_company_name("The Natco Pharma Ltd.") == normalize_company_name("natco  pharma limited") == "natcopharma"
+    assert normalize_company_name("Larsen & Toubro") == normalize_company_name("Larsen and Toubro Ltd")
+
+
+def test_report_spelling_wins_over_stocks_tab_spelling():
+    resolver = CompanyNameResolver(["Natco Pharma Ltd"], ["NATCO PHARMA LIMITED"])
+    assert resolver.resolve("NATCO PHARMA LIMITED") == "Natco Pharma Ltd"
+    assert resolver.resolve("natco pharma") == "Natco Pharma Ltd"
+
+
+def test_first_of_two_colliding_report_names_is_canonical():
+    resolver = CompanyNameResolver(["Indo Auto Ltd", "INDO AUTO LIMITED"])
+    assert resolver.resolve("indo auto") == "Indo Auto Ltd"
+    assert resolver.resolve("INDO AUTO LIMITED") == "Indo Auto Ltd"
+
+
+def test_alias_never_takes_over_a_company_name():
+    # "ITC" is ITC Ltd's own name, so an alias pointing it elsewhere is ignored
+    resolver = CompanyNameResolver(["ITC Ltd", "Infosys Ltd"], aliases={"ITC": "Infosys Ltd", "INFY": "Infosys Ltd"})
+    assert resolver.resolve("ITC") == "ITC Ltd"
+    assert resolver.resolve("infy") == "Infosys Ltd"
+
+
+def test_shipped_aliases_resolve_real_tickers_only():
+    resolver = CompanyNameResolver(
+        ["Larsen and Toubro Limited", "Reliance Industries Ltd", "Bharat Petroleum Corporation Ltd"],
+        aliases=load_aliases(ALIASES_PATH),
+    )
+    assert resolver.resolve("L&T") == "Larsen and Toubro Limited"
+    assert resolver.resolve("RELIANCE") == "Reliance Industries Ltd"
+    assert resolver.resolve("BPCL") == "Bharat Petroleum Corporation Ltd"
+    assert resolver.resolve("BHARATPETR") is None # a name prefix is not a ticker
+
+
+def test_unknown_and_empty_names_do_not_resolve():
+    resolver = CompanyNameResolver(["Natco Pharma Ltd"])
+    assert resolver.resolve("Nonexistent Corp") is None
+    assert resolver.resolve("") is None
+
+
+def test_missing_alias_file_means_no_aliases(tmp_path):
+    assert load_aliases(tmp_path / "missing.json") == {}
@@ -0,0 +1,69 @@
+import json
+import math
+
+import pytest
+
+from report_analytics import (
+    FLAGS_COLUMN,
+    PERCENTILE_COLUMN,
+    SCORE_COLUMN,
+    build_score_table,
+    factor_names,
+    filter_score_table,
+    percentile_of,
+)
+from report_store import INVESTMENT_SCORE_KEY, REPORT_PART_KEYS, build_company_report
+
+
+def _report(name, score, assessments):
+    summary_table = [{"Factor": factor, "Assessment": assessment} for factor, assessment in assessments.items()]
+    row = {"company_name": name, REPORT_PART_KEYS[1]: json.dumps({"summary_table": summary_table}), INVESTMENT_SCORE_KEY: score}
+    return [build_company_report(row)]
+
+
+REPORTS = {
+    "Alpha Ltd": _report("Alpha Ltd", 80, {"High Debt": "yes", "Fraud": "NO"}),
+    "Beta Ltd": _report("Beta Ltd", 40, {"High Debt": "NO", "Fraud": "YES"}),
+    "Gamma Ltd": _report("Gamma Ltd", 40, {"High Debt": "YES", "Fraud": "YES", "Cyclical": "YES"}),
+    "Unscored Ltd": _report("Unscored Ltd", "N/A", {"High Debt": "NO"}),
+    "Empty Ltd": [],
+}
+
+
+def test_build_score_table():
+    table = build_score_table(REPORTS)
+    assert list(table.index) == ["Alpha Ltd", "Beta Ltd", "Gamma Ltd", "Unscored Ltd"]
+    assert factor_names(table) == ["High Debt", "Fraud", "Cyclical"]
+    assert math.isnan(table.at["Unscored Ltd", SCORE_COLUMN])
+    assert table.at["Alpha Ltd", "High Debt"] == "YES" # assessments are upper-cased
+    assert table[FLAGS_COLUMN].to_dict() == {"Alpha Ltd": 1, "Beta Ltd": 1, "Gamma Ltd": 3, "Unscored Ltd": 0}
+
+
+def test_build_score_table_without_reports():
+    table = build_score_table({})
+    assert table.empty and {SCORE_COLUMN, PERCENTILE_COLUMN, FLAGS_COLUMN} <= set(table.columns)
+
+
+def test_percentile_of():
+    table = build_score_table(REPORTS)
+    assert percentile_of(table, "Alpha Ltd") == 100.0
+    # Ties share the higher rank: both 40s are at or above two of the three scores
+    assert percentile_of(table, "Beta Ltd") == percentile_of(table, "Gamma Ltd") == pytest.approx(200 / 3)
+    assert percentile_of(table, "Unscored Ltd") is None
+    assert percentile_of(table, "No Such Ltd") is None
+
+
+def test_filter_keeps_unscored_companies_without_a_score_range():
+    table = build_score_table(REPORTS)
+    assert len(filter_score_table(table)) == 4
+    assert list(filter_score_table(table).index)[-1] == "Unscored Ltd" # sorted last
+    assert list(filter_score_table(table, score_range=(0, 100)).index) == ["Alpha Ltd", "Beta Ltd", "Gamma Ltd"]
+
+
+def test_filter_combinations_and_sorting():
+    table = build_score_table(REPORTS)
+    assert list(filter_score_table(table, score_range=(30, 50)).index) == ["Beta Ltd", "Gamma Ltd"]
+    assert list(filter_score_table(table, min_percentile=70).index) == ["Alpha Ltd"]
+    assert list(filter_score_table(table, exclude_flagged=["Fraud", "No Such Factor"]).index) == ["Alpha Ltd", "Unscored Ltd"]
+    assert list(filter_score_table(table, name_query="MA L").index) == ["Gamma Ltd"]
+    assert list(filter_score_table(table, sort_by=FLAGS_COLUMN, ascending=True).index) == ["Unscored Ltd", "Alpha Ltd", "Beta Ltd", "Gamma Ltd"]
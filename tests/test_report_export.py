@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+import pytest
+
+import report_export
+from benchmarks.synthetic_sheet import make_fake_client, make_report_store
+from report_export import COMPANY_COLUMN, EXPORT_FORMATS, export_reports
+from report_store import REPORT_PART_KEYS
+from report_sync import ReportSyncEngine
+
+
+@pytest.fixture(scope="module")
+def reports():
+    engine = ReportSyncEngine(make_report_store(make_fake_client(20)), compress_bodies=True)
+    engine.sync()
+    return engine.reports
+
+
+def _counting_parser(monkeypatch):
+    calls = []
+    parse = report_export.parse_report_part
+
+    def counting_parse(text):
+        calls.append(text)
+        return parse(text)
+
+    monkeypatch.setattr(report_export, "parse_report_part", counting_parse)
+    return calls
+
+
+def test_csv_reads_the_reports_once_and_parses_each_part_once(reports, monkeypatch):
+    calls = _counting_parser(monkeypatch)
+    data = export_reports("CSV", iter(reports.items())) # a one-shot iterator: a second pass would see nothing
+    rows = list(csv.DictReader(io.StringIO(data.decode("utf-8-sig"))))
+    assert [row[COMPANY_COLUMN] for row in rows] == list(reports)
+    assert len(calls) == len(reports) * len(REPORT_PART_KEYS)
+    assert rows[0]["Part 2/summary_table/High Debt/Assessment"]
+
+
+def test_jsonl_keeps_parts_nested(reports):
+    lines = export_reports("JSON Lines", iter(reports.items())).decode("utf-8").splitlines()
+    assert len(lines) == len(reports)
+    record = json.loads(lines[0])
+    assert set(REPORT_PART_KEYS) <= set(record)
+
+
+@pytest.mark.skipif("Excel" not in EXPORT_FORMATS, reason="openpyxl not installed")
+def test_excel_has_a_row_per_company(reports):
+    from openpyxl import load_workbook
+
+    sheet = load_workbook(io.BytesIO(export_reports("Excel", iter(reports.items())))).active
+    assert sheet.max_row == len(reports) + 1
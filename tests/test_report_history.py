@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from benchmarks.synthetic_sheet import SHEET_NAME, make_fake_client, make_report_store, make_row
+from report_history import ADDED, BASELINE, CHANGED, REMOVED, ReportHistory
+from report_store import REPORT_PART_KEYS
+from report_sync import ReportSyncEngine
+
+
+@pytest.fixture
+def synced(tmp_path):
+    client = make_fake_client(10)
+    engine = ReportSyncEngine(make_report_store(client))
+    engine.sync()
+    history = ReportHistory(tmp_path / "history.db")
+    history.record(engine.reports, engine.row_hashes, engine.generation)
+    yield client.open(SHEET_NAME), engine, history
+    history.close()
+
+
+def _record(engine, history):
+    engine.sync()
+    return history.record(engine.reports, engine.row_hashes, engine.generation)
+
+
+def test_first_recording_is_a_baseline_and_not_recently_updated(synced):
+    spreadsheet, engine, history = synced
+    assert len(history) == 10
+    company_name = next(iter(engine.reports))
+    assert [version.change for version in history.versions(company_name)] == [BASELINE]
+    assert history.recent_changes() == []
+    # The same generation again records nothing
+    assert history.record(engine.reports, engine.row_hashes, engine.generation) == 0
+
+
+def test_rewritten_rows_get_a_new_version_and_a_diff(synced):
+    spreadsheet, engine, history = synced
+    spreadsheet.rewrite_rows(0.2)
+    assert _record(engine, history) == 2
+    changed = engine.last_result.changed
+    assert {version.company_name for version in history.recent_changes()} == set(changed)
+
+    after, before = history.versions(changed[0])
+    assert (after.change, before.change) == (CHANGED, BASELINE)
+    diff = history.diff(before, after)
+    assert [part.part_key for part in diff.parts] == list(REPORT_PART_KEYS)
+    changed_parts = [part for part in diff.parts if part.status == "changed"]
+    assert changed_parts and all(part.rows for part in changed_parts)
+    assert all(not part.rows for part in diff.parts if part.status == "unchanged")
+    for part_key, digest in zip(REPORT_PART_KEYS, after.part_hashes):
+        assert history.part_text(digest) == engine.reports[changed[0]][0]["output"]["report_details"].raw(part_key)
+
+
+def test_unchanged_companies_share_stored_bodies(synced):
+    spreadsheet, engine, history = synced
+    spreadsheet.rewrite_rows(0.1)
+    _record(engine, history)
+    untouched = next(name for name in engine.reports if name not in engine.last_result.changed)
+    assert len(history.versions(untouched)) == 1
+
+
+def test_removed_and_added_companies(synced):
+    spreadsheet, engine, history = synced
+    rows = spreadsheet.worksheets["result_stocks"].rows
+    removed = rows.pop()["company_name"]
+    rows.append(make_row("Brand New Industries Ltd", random.Random(7)))
+    spreadsheet.touch()
+    assert _record(engine, history) == 2
+
+    latest = {version.company_name: version for version in history.recent_changes()}
+    assert latest[removed].change == REMOVED and latest[removed].part_hashes == []
+    assert latest["Brand New Industries Ltd"].change == ADDED
+    assert len(history) == 10
+    removal, previous = history.versions(removed)
+    assert {part.status for part in history.diff(previous, removal).parts} == {"removed"}
+
+
+def test_history_survives_a_reopen(synced, tmp_path):
+    spreadsheet, engine, history = synced
+    history.close()
+    reopened = ReportHistory(tmp_path / "history.db")
+    # Nothing changed since the last recording, so a new generation adds no versions
+    assert reopened.record(engine.reports, engine.row_hashes, generation=None) == 0
+    assert len(reopened) == 10
+    reopened.close()
@@ -0,0 +1,59 @@
+import pytest
+
+from benchmarks.synthetic_sheet import make_fake_client, make_report_store
+from report_snapshot import SNAPSHOT_MAGIC, load_snapshot, write_snapshot
+from report_store import INVESTMENT_SCORE_KEY, REPORT_PART_KEYS
+from report_sync import ReportSyncEngine
+
+
+@pytest.fixture
+def engine():
+    engine = ReportSyncEngine(make_report_store(make_fake_client(10)))
+    engine.sync()
+    return engine
+
+
+def _details(reports, company_name):
+    return reports[company_name][0]["output"]["report_details"]
+
+
+def test_round_trip_keeps_reports_row_hashes_and_version(engine, tmp_path):
+    path = tmp_path / "reports.snapshot"
+    write_snapshot(path, engine.reports, engine.row_hashes, "v1")
+    snapshot = load_snapshot(path)
+    assert snapshot.source_version == "v1"
+    assert snapshot.row_hashes == engine.row_hashes
+    assert list(snapshot.reports) == list(engine.reports)
+    for company_name, report_data_list in engine.reports.items():
+        restored = snapshot.reports[company_name][0]["output"]
+        assert restored[INVESTMENT_SCORE_KEY] == report_data_list[0]["output"][INVESTMENT_SCORE_KEY]
+        for part_key in REPORT_PART_KEYS:
+            assert restored["report_details"].raw(part_key) == _details(engine.reports, company_name).raw(part_key)
+
+
+def test_restarted_engine_serves_the_snapshot_without_a_sync(engine, tmp_path):
+    path = tmp_path / "reports.snapshot"
+    write_snapshot(path, engine.reports, engine.row_hashes)
+    restarted = ReportSyncEngine(make_report_store(make_fake_client(10)), snapshot_path=path)
+    restarted.restore()
+    assert restarted.loaded and set(restarted.reports) == set(engine.reports)
+    assert restarted.sync() # same rows, but the restored snapshot had no source version
+    assert not restarted.last_result.touched
+
+
+def test_missing_snapshot_is_a_cold_start(tmp_path):
+    assert load_snapshot(tmp_path / "missing.snapshot") is None
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: b"NOTASNAP" + data[len(SNAPSHOT_MAGIC):], # wrong magic
+    lambda data: data[:len(SNAPSHOT_MAGIC) + 4], # cut inside the header length
+    lambda data: data[:len(SNAPSHOT_MAGIC) + 8 + 20], # cut inside the JSON header
+    lambda data: data[:-10], # cut inside the report bodies
+    lambda data: b"", # empty file
+])
+def test_corrupt_snapshot_is_ignored(engine, tmp_path, corrupt):
+    path = tmp_path / "reports.snapshot"
+    write_snapshot(path, engine.reports, engine.row_hashes)
+    path.write_bytes(corrupt(path.read_bytes()))
+    assert load_snapshot(path) is None
@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+
+import report_store
+from benchmarks.synthetic_sheet import make_fake_client, make_report_store
+from report_snapshot import load_snapshot, write_snapshot
+from report_store import (
+    REPORT_PART_KEYS,
+    SQLiteReportStore,
+    build_company_report,
+    copy_store,
+    part_has_content,
+    raw_text_length,
+)
+
+ROW = {
+    "company_name": "Natco Pharma Ltd",
+    REPORT_PART_KEYS[0]: '{"summary": "Promoters hold 49%"}',
+    REPORT_PART_KEYS[1]: " {} ",
+    REPORT_PART_KEYS[2]: "",
+    "Part 4: investment score": "7",
+}
+EXPECTED = [True, False, False]
+
+
+@pytest.fixture
+def no_inflating(monkeypatch):
+    # Any decompression from here on fails the test
+    def refuse(*args, **kwargs):
+        raise AssertionError("part was decompressed")
+
+    monkeypatch.setattr(report_store.zlib, "decompress", refuse) # the zlib module report_snapshot uses too
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_has_content_matches_the_parsed_part(compress):
+    report_details = build_company_report(ROW, compress)["output"]["report_details"]
+    assert [part_has_content(report_details, part_key) for part_key in REPORT_PART_KEYS] == EXPECTED
+    assert [bool(report_details[part_key]) for part_key in REPORT_PART_KEYS] == EXPECTED
+
+
+def test_compressed_parts_answer_has_content_without_inflating(no_inflating):
+    report_details = build_company_report(ROW, compress=True)["output"]["report_details"]
+    assert [part_has_content(report_details, part_key) for part_key in REPORT_PART_KEYS] == EXPECTED
+
+
+def test_snapshot_records_which_parts_are_empty(tmp_path, no_inflating):
+    path = tmp_path / "reports.snapshot"
+    write_snapshot(path, {ROW["company_name"]: [build_company_report(ROW)]}, {})
+    report_details = load_snapshot(path).reports[ROW["company_name"]][0]["output"]["report_details"]
+    assert [part_has_content(report_details, part_key) for part_key in REPORT_PART_KEYS] == EXPECTED
+
+
+@pytest.mark.parametrize("through_snapshot", [False, True])
+def test_raw_text_length_without_inflating(tmp_path, through_snapshot, no_inflating):
+    expected = sum(len(ROW[part_key]) for part_key in REPORT_PART_KEYS)
+    report = build_company_report(ROW, compress=True)
+    if through_snapshot:
+        write_snapshot(tmp_path / "reports.snapshot", {ROW["company_name"]: [report]}, {})
+        report = load_snapshot(tmp_path / "reports.snapshot").reports[ROW["company_name"]][0]
+    assert raw_text_length(report["output"]["report_details"]) == expected
+    assert raw_text_length(build_company_report(ROW)["output"]["report_details"]) == expected
+
+
+@pytest.fixture
+def sheet_store():
+    return make_report_store(make_fake_client(30))
+
+
+def test_copy_store_round_trip(tmp_path, sheet_store):
+    copy_store(sheet_store, SQLiteReportStore(tmp_path / "reports.db", create=True))
+    store = SQLiteReportStore(tmp_path / "reports.db")
+    assert store.fetch_rows() == sheet_store.fetch_rows()
+    assert store.fetch_stock_names() == sheet_store.fetch_stock_names()
+
+    rows = store.fetch_rows()
+    wanted = [rows[3]["company_name"], "No Such Ltd", rows[0]["company_name"]]
+    assert sorted(row["company_name"] for row in store.fetch_rows_for(wanted)) == sorted(wanted[::2])
+    assert store.fetch_rows_for(store.fetch_stock_names() * 40) # past one 500-name chunk
+    assert store.get_reports(wanted).keys() == {wanted[0], wanted[2]}
+
+
+def test_missing_sqlite_file_is_an_error(tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        SQLiteReportStore(tmp_path / "typo.db")
+    assert not (tmp_path / "typo.db").exists()
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from benchmarks.synthetic_sheet import SHEET_NAME, make_fake_client, make_report_store, make_row
+from report_sync import BackgroundRefresher, ReportSyncEngine
+
+
+def _engine(companies=20):
+    client = make_fake_client(companies)
+    return client.open(SHEET_NAME), ReportSyncEngine(make_report_store(client))
+
+
+def test_first_sync_adds_every_company():
+    spreadsheet, engine = _engine()
+    assert engine.sync()
+    result = engine.last_result
+    assert len(result.added) == result.row_count == 20
+    assert not result.changed and not result.removed
+    assert engine.generation == 1
+
+
+def test_unchanged_version_skips_the_download():
+    spreadsheet, engine = _engine()
+    engine.sync()
+    reports = engine.reports
+    assert not engine.sync()
+    assert engine.last_result.skipped
+    assert engine.reports is reports and engine.generation == 1
+
+
+def test_rewritten_rows_are_changed_and_the_rest_reused():
+    spreadsheet, engine = _engine()
+    engine.sync()
+    before = dict(engine.reports)
+    spreadsheet.rewrite_rows(0.25)
+    assert engine.sync()
+    result = engine.last_result
+    assert len(result.changed) == 5
+    assert not result.added and not result.removed
+    for company_name, report_data_list in engine.reports.items():
+        assert (report_data_list is before[company_name]) == (company_name not in result.changed)
+    assert engine.generation == 2
+
+
+def test_removed_and_added_rows():
+    spreadsheet, engine = _engine()
+    engine.sync()
+    rows = spreadsheet.worksheets["result_stocks"].rows
+    removed = rows.pop(0)["company_name"]
+    rows.append(make_row("Brand New Industries Ltd", random.Random(7)))
+    spreadsheet.touch()
+    assert engine.sync()
+    result = engine.last_result
+    assert result.removed == [removed]
+    assert result.added == ["Brand New Industries Ltd"]
+    assert not result.changed
+    assert removed not in engine.reports and "Brand New Industries Ltd" in engine.reports
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSync:
+    """Just the bookkeeping BackgroundRefresher reads, with attempts stamped by a fake clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.generation = 0
+        self.last_attempt = None
+        self.last_error = None
+        self.fail = False
+
+    def sync(self):
+        self.last_attempt = self.clock()
+        if self.fail:
+            self.last_error = RuntimeError("sheet unavailable")
+            raise self.last_error
+        self.last_error = None
+        self.generation += 1
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_refresher_schedules_ahead_of_the_interval_and_retries_sooner(clock):
+    sync = FakeSync(clock)
+    refresher = BackgroundRefresher([], refresh_ahead=0.1, retry_delay=30.0)
+    changes = []
+    assert refresher._next_due(sync, 600) == 0.0 # never synced
+
+    clock.now = 100.0
+    refresher._refresh(sync, lambda: changes.append(clock.now))
+    assert refresher._next_due(sync, 600) == pytest.approx(640.0) # 10% before the interval runs out
+    assert changes == [100.0]
+
+    clock.now = 640.0
+    sync.fail = True
+    refresher._refresh(sync, lambda: changes.append(clock.now))
+    assert refresher._next_due(sync, 600) == 670.0 # retry_delay, not the full interval
+    assert changes == [100.0] # nothing changed, so derived caches aren't rebuilt
+
+    clock.now = 670.0
+    sync.fail = False
+    refresher._refresh(sync, lambda: changes.append(clock.now))
+    assert refresher._next_due(sync, 600) == pytest.approx(1210.0)
+    assert changes == [100.0, 670.0]
+
+
+def test_retry_delay_never_exceeds_the_interval(clock):
+    sync = FakeSync(clock)
+    sync.fail = True
+    refresher = BackgroundRefresher([], retry_delay=30.0)
+    clock.now = 50.0
+    refresher._refresh(sync, None)
+    assert refresher._next_due(sync, 20) == 70.0
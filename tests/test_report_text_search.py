@@ -0,0 +1,91 @@
+import json
+import random
+
+import pytest
+
+from report_store import REPORT_PART_KEYS, build_company_report
+from report_text_search import ReportTextIndex, tokenize
+
+WORDS = "cash flow debt pledge promoter margin export moat capex guidance dividend inventory".split()
+QUERIES = ["cash", "cash flow", "debt pledge", "moat export capex", "margin", "guidance dividend", "nothing"]
+
+
+def make_reports(company_names, seed=0):
+    # Short parts over a small vocabulary, so each query matches some documents and not others
+    rng = random.Random(seed)
+    reports = {}
+    for company_name in company_names:
+        row = {"company_name": company_name, "Part 4: investment score": rng.randint(0, 100)}
+        for part_key in REPORT_PART_KEYS:
+            row[part_key] = json.dumps({"summary": " ".join(rng.choices(WORDS, k=rng.randint(0, 6)))})
+        reports[company_name] = [build_company_report(row)]
+    return reports
+
+
+def brute_force(reports, query):
+    terms = set(tokenize(query))
+    return {
+        (company_name, part_key)
+        for company_name, report_data_list in reports.items()
+        for part_key in REPORT_PART_KEYS
+        if terms <= set(tokenize(report_data_list[0]["output"]["report_details"].raw(part_key)))
+    }
+
+
+def found(index, query):
+    return {(hit.company_name, hit.part_key) for hit in index.search(query, limit=10_000)}
+
+
+def ranking(index, query):
+    return [(hit.company_name, hit.part_key, pytest.approx(hit.score)) for hit in index.search(query, limit=10_000)]
+
+
+@pytest.fixture
+def reports():
+    return make_reports([f"Company {i:03d}" for i in range(200)])
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_matches_a_brute_force_scan(reports, query):
+    index = ReportTextIndex()
+    index.update(reports)
+    assert found(index, query) == brute_force(reports, query)
+
+
+def test_removed_and_changed_companies_drop_out(reports):
+    index = ReportTextIndex()
+    index.update(reports)
+    updated = dict(reports)
+    for company_name in list(updated)[:50]:
+        del updated[company_name]
+    updated.update(make_reports(list(updated)[:50], seed=1)) # new report objects, new text
+    assert index.update(updated) == (150, 300)
+    for query in QUERIES:
+        assert found(index, query) == brute_force(updated, query)
+
+
+def test_results_survive_compaction(reports):
+    index = ReportTextIndex()
+    index.update(reports)
+    updated = {company_name: reports[company_name] for company_name in list(reports)[100:]}
+    index.update(updated)
+    before = {query: found(index, query) for query in QUERIES}
+    index._compact()
+    fresh = ReportTextIndex()
+    fresh.update(updated)
+    for query in QUERIES:
+        assert found(index, query) == before[query]
+        # Compaction also drops the dead ids from document frequencies, so scores match a fresh build
+        assert ranking(index, query) == ranking(fresh, query)
+
+
+def test_exact_phrase_ranks_higher():
+    index = ReportTextIndex()
+    index.update({
+        "Phrase Ltd": [build_company_report({"company_name": "Phrase Ltd", REPORT_PART_KEYS[0]: "Strong cash flow this year"})],
+        "Scattered Ltd": [build_company_report({"company_name": "Scattered Ltd", REPORT_PART_KEYS[0]: "Strong flow of cash year"})],
+    })
+    phrase, scattered = index.search("cash flow")
+    assert (phrase.company_name, scattered.company_name) == ("Phrase Ltd", "Scattered Ltd")
+    assert phrase.score == pytest.approx(2 * scattered.score) # same length and counts, so only the boost differs
+    assert "cash flow" in phrase.snippet
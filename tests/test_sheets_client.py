@@ -0,0 +1,131 @@
+import pytest
+
+from benchmarks.synthetic_sheet import make_fake_client
+from report_store import GoogleSheetsReportStore
+from sheets_client import CircuitBreaker, SheetsClient, SheetsUnavailable
+
+SHEET = "ai_agents"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def fake_client():
+    return make_fake_client(5)
+
+
+def make_client(authorize, clock, **kwargs):
+    return SheetsClient(authorize, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def read_records(spreadsheet):
+    return spreadsheet.worksheet("result_stocks").get_all_records()
+
+
+def test_retries_quota_and_server_errors(fake_client, clock):
+    client = make_client(lambda: fake_client, clock)
+    fake_client.open(SHEET).fail_next = [429, 503]
+    assert len(client.with_spreadsheet(SHEET, read_records)) == 5
+    assert len(clock.sleeps) == 2
+
+
+def test_retries_dropped_connections(fake_client, clock):
+    client = make_client(lambda: fake_client, clock)
+    failures = [ConnectionResetError("reset by peer")]
+
+    def flaky(spreadsheet):
+        if failures:
+            raise failures.pop()
+        return read_records(spreadsheet)
+
+    assert len(client.with_spreadsheet(SHEET, flaky)) == 5
+    assert len(clock.sleeps) == 1
+
+
+@pytest.mark.parametrize("error", [FileNotFoundError("assets/creds.json"), ValueError("bad JSON")])
+def test_config_errors_are_not_retried(clock, error):
+    calls = []
+
+    def authorize():
+        calls.append(1)
+        raise error
+
+    client = make_client(authorize, clock)
+    with pytest.raises(type(error)):
+        client.with_spreadsheet(SHEET, read_records)
+    assert len(calls) == 1
+    assert clock.sleeps == []
+    assert not client.breaker.is_open
+    assert client.breaker.failures == 0
+
+
+def test_version_probe_is_not_retried(fake_client, clock):
+    store = GoogleSheetsReportStore(make_client(lambda: fake_client, clock), SHEET, "result_stocks", "stocks")
+    spreadsheet = fake_client.open(SHEET)
+    spreadsheet.fail_next = [503, 503]
+    with pytest.raises(SheetsUnavailable):
+        store.fetch_version()
+    assert spreadsheet.calls == 1
+    assert spreadsheet.fail_next == [503]
+    assert clock.sleeps == []
+
+
+def test_breaker_opens_then_half_opens_for_one_probe_then_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+    clock.now += 60
+    assert breaker.allow() # the probe
+    assert not breaker.allow() # everyone else fails fast while it's in flight
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_client_fails_fast_while_open_and_recovers(fake_client, clock):
+    client = make_client(lambda: fake_client, clock, max_retries=0, failure_threshold=2, reset_timeout=60)
+    spreadsheet = fake_client.open(SHEET)
+    spreadsheet.fail_next = [503, 503]
+    for _ in range(2):
+        with pytest.raises(SheetsUnavailable):
+            client.with_spreadsheet(SHEET, read_records)
+
+    calls = spreadsheet.calls
+    with pytest.raises(SheetsUnavailable, match="circuit open"):
+        client.with_spreadsheet(SHEET, read_records)
+    assert spreadsheet.calls == calls # short-circuited without touching Sheets
+
+    clock.now += 60
+    assert len(client.with_spreadsheet(SHEET, read_records)) == 5
+    assert not client.breaker.is_open
@@ -0,0 +1,67 @@
+import pytest
+
+from stock_search import StockNameIndex, edit_distance
+
+NAMES = ["Tata Motors Ltd", "Infosys Ltd", "Bata India Ltd", "Natco Pharma Ltd", "Ultratech Cement Ltd", "Titan Company Ltd"]
+
+
+def test_prefixes_rank_before_word_starts_and_substrings():
+    index = StockNameIndex(NAMES)
+    assert index.search("ta") == ["Tata Motors Ltd", "Bata India Ltd", "Titan Company Ltd"]
+    assert index.search("ti") == ["Titan Company Ltd"]
+
+
+def test_short_query_finds_substrings_mid_word():
+    index = StockNameIndex(NAMES)
+    assert index.search("co") == ["Titan Company Ltd", "Natco Pharma Ltd"]
+    assert index.search("x") == []
+
+
+def test_short_query_scan_respects_limit_and_exclude():
+    index = StockNameIndex(NAMES)
+    assert index.search("at", limit=2) == ["Bata India Ltd", "Natco Pharma Ltd"]
+    assert index.search("at", exclude=["Bata India Ltd"]) == ["Natco Pharma Ltd", "Tata Motors Ltd", "Ultratech Cement Ltd"]
+
+
+def test_longer_queries_match_substrings_and_typos():
+    index = StockNameIndex(NAMES)
+    assert index.search("pharma") == ["Natco Pharma Ltd"]
+    assert index.search("tech") == ["Ultratech Cement Ltd"]
+    assert index.search("infosis") == ["Infosys Ltd"]
+
+
+NIFTY = [
+    "Reliance Industries Ltd", "Hindustan Unilever Ltd", "Hindalco Industries Ltd", "Natco Pharma Ltd",
+    "Bharat Petroleum Corporation Ltd", "Sun Pharmaceutical Industries Ltd", "Tata Motors Ltd", "Infosys Ltd",
+]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("relaince", "Reliance Industries Ltd"), # swapped letters
+    ("hindustn", "Hindustan Unilever Ltd"), # dropped letter
+    ("natko", "Natco Pharma Ltd"), # wrong letter
+    ("nacto", "Natco Pharma Ltd"), # swapped letters in a short word
+    ("relaince ind", "Reliance Industries Ltd"), # misspelt first word, second still being typed
+    ("bharat petrolium", "Bharat Petroleum Corporation Ltd"),
+    ("sun phrama", "Sun Pharmaceutical Industries Ltd"),
+    ("tata moters", "Tata Motors Ltd"),
+])
+def test_misspelt_words_match(query, expected):
+    assert StockNameIndex(NIFTY).search(query)[0] == expected
+
+
+def test_typos_rank_after_exact_matches_and_short_words_need_to_be_exact():
+    index = StockNameIndex(NIFTY)
+    assert index.search("hind") == ["Hindalco Industries Ltd", "Hindustan Unilever Ltd"]
+    assert index.search("tta") == [] # three letters: too short to guess at
+    assert index.search("xelaince") == [] # typos are taken to be past the first letter
+    assert index.search("relaince", exclude=["Reliance Industries Ltd"]) == []
+
+
+def test_edit_distance():
+    assert edit_distance("relaince", "reliance", 2) == 1
+    assert edit_distance("hindustn", "hindustan", 2) == 1
+    assert edit_distance("natko", "natco", 1) == 1
+    assert edit_distance("natko", "tata", 1) == 2 # over budget
+    assert edit_distance("pharmac", "pharmaceutical", 1, prefix=True) == 0
+    assert edit_distance("phrama", "pharmaceutical", 1, prefix=True) == 1
@@ -0,0 +1,41 @@
+import json
+import time
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracing.configure(path)
+    yield path
+    tracing.configure(None)
+
+
+def _records(path, kind):
+    return [record for record in map(json.loads, path.read_text().splitlines()) if record["kind"] == kind]
+
+
+def test_interrupted_rerun_ends_with_its_last_span(trace_file):
+    first = tracing.begin_rerun("session")
+    with tracing.span("work"):
+        pass
+    time.sleep(0.05) # idle between the interrupted rerun and the next one
+    second = tracing.begin_rerun("session", first)
+    tracing.end_rerun(second)
+    interrupted, finished = _records(trace_file, "rerun")
+    assert (interrupted["status"], interrupted["spans"], finished["status"]) == ("interrupted", 1, "ok")
+    assert interrupted["duration_ms"] < 50
+
+
+def test_writer_keeps_one_handle_and_flushes_per_rerun(trace_file):
+    rerun = tracing.begin_rerun("session")
+    for _ in range(3):
+        with tracing.span("work"):
+            pass
+    handle = tracing._writer._file
+    tracing.end_rerun(rerun)
+    assert tracing._writer._file is handle
+    assert len(_records(trace_file, "span")) == 3
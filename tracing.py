@@ -0,0 +1,152 @@
+import atexit
+import contextvars
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# Spans are cheap enough to always collect; they're only shown or written out when asked for
+_current_rerun = contextvars.ContextVar("current_rerun", default=None)
+_rerun_ids = itertools.count(1)
+_writer = None
+recent_records = deque(maxlen=2000) # Last spans across the process, including background threads
+
+
+class Span:
+    __slots__ = ("name", "attrs", "started_at", "duration_ms")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class RerunTrace:
+    """Spans recorded while one Streamlit rerun of one session was executing."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.rerun_id = next(_rerun_ids)
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans = []
+        self.finished = False
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._started) * 1e3
+
+
+class JsonlTraceWriter:
+    """Appends records to one file handle, opened on first use and flushed once per rerun."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def configure(trace_file=None):
+    # Append every finished span to trace_file as JSON Lines (None turns the export off)
+    global _writer
+    if _writer is not None:
+        _writer.close()
+    _writer = JsonlTraceWriter(trace_file) if trace_file else None
+    if _writer is not None:
+        atexit.register(_writer.close) # spans from background threads since the last rerun
+
+
+def new_session_id():
+    return uuid.uuid4().hex[:12]
+
+
+def _record(span, rerun, kind="span"):
+    record = {
+        "kind": kind,
+        "name": span.name,
+        "started_at": span.started_at,
+        "duration_ms": round(span.duration_ms, 3),
+        "session_id": rerun.session_id if rerun else None,
+        "rerun_id": rerun.rerun_id if rerun else None,
+        "thread": threading.current_thread().name,
+        **span.attrs,
+    }
+    recent_records.append(record)
+    if _writer is not None:
+        try:
+            _writer.write(record)
+        except OSError:
+            pass # Tracing must never break the page
+    return record
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a block. Add attributes as they become known: `with span("x") as s: s.set(rows=3)`."""
+    current = Span(name, attrs)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - started) * 1e3
+        rerun = _current_rerun.get()
+        if rerun is not None and not rerun.finished:
+            rerun.spans.append(current)
+        _record(current, rerun)
+
+
+def _finish(rerun, status, duration_ms):
+    rerun.finished = True
+    summary = Span("rerun", {"status": status, "spans": len(rerun.spans)})
+    summary.started_at = rerun.started_at
+    summary.duration_ms = duration_ms
+    _record(summary, rerun, kind="rerun")
+    if _writer is not None:
+        try:
+            _writer.flush()
+        except OSError:
+            pass
+
+
+def begin_rerun(session_id, previous=None):
+    # A rerun cut short by st.rerun()/st.stop() never reaches end_rerun; close it here instead,
+    # timed to the end of its last span rather than to now (the user may have been idle since)
+    if previous is not None and not previous.finished:
+        ended_at = max((done.started_at + done.duration_ms / 1e3 for done in previous.spans), default=previous.started_at)
+        _finish(previous, "interrupted", (ended_at - previous.started_at) * 1e3)
+    rerun = RerunTrace(session_id)
+    _current_rerun.set(rerun)
+    return rerun
+
+
+def end_rerun(rerun):
+    if not rerun.finished:
+        _finish(rerun, "ok", rerun.elapsed_ms)